@@ -3,6 +3,10 @@
 from time import time
 from etl.ingestors.seed_data import seed_tables
 from etl.copy_data import copy_data
+from kg.engine import engine
+from kg.indexes import reindex_vector_indexes
+from kg.utils.ann import export_excerpt_vectors
+from kg.settings import VECTOR_INDEX_TYPE, USE_ANN_ACCELERATOR
 from etl.ingestors import (
     kev,
     eia,
@@ -68,6 +72,17 @@ def run_ingestion_pipeline():
             print(str(e))
         print_elapsed_time(start_time)
 
+    # IVFFlat indexes need to be rebuilt to reflect the newly ingested data
+    if VECTOR_INDEX_TYPE == "ivfflat":
+        reindex_vector_indexes(engine, verbose=True)
+        print_elapsed_time(start_time)
+
+    # Export the excerpt vectors of the new data version for in-process search,
+    # so API workers that share ANN_INDEX_DIR don't need to export them
+    if USE_ANN_ACCELERATOR:
+        export_excerpt_vectors(verbose=True)
+        print_elapsed_time(start_time)
+
 
 if __name__ == "__main__":
     run_ingestion_pipeline()
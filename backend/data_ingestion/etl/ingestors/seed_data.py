@@ -7,6 +7,7 @@ from kg.engine import engine
 from kg.tables import Source
 from kg.table_index import TableIndex
 from kg.utils.read import get_unique_values, get_table_sizes
+from kg.utils.version import bump_data_version
 from settings import SEED_DATA_PATH
 
 
@@ -25,6 +26,7 @@ def seed_tables(verbose=True):
                 for row in new_rows:
                     session.add(row)
                 session.commit()
+            bump_data_version()
     if verbose:
         print("Inserted static seed data.")
         get_table_sizes(verbose=True)
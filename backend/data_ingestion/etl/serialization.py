@@ -5,7 +5,9 @@ from hashlib import sha256
 from datetime import datetime, date
 from sqlmodel import Session, SQLModel, select
 from kg.utils.read import get_table_sizes
+from kg.utils.version import bump_data_version
 from kg.utils.embeddings import create_embeddings
+from kg.utils.graph import update_entity_cooccurrence
 from kg.tables import Entity, UEntity
 from kg.engine import engine
 from kg.utils.clean import remove_duplicate_dict_values
@@ -72,13 +74,32 @@ def insert_objects_from_dict(
         "uentity": [UEntity(), ...]
     }
     """
+    # copy each report's published_at date onto its excerpts and entities
+    published_at_by_report = {
+        r.id: r.published_at for r in new_db_rows.get("report", [])
+    }
+    for table_name in ["excerpt", "entity"]:
+        for obj in new_db_rows.get(table_name, []):
+            if obj.report_id in published_at_by_report:
+                obj.published_at = published_at_by_report[obj.report_id]
+
     for table_name, objects in new_db_rows.items():
         if verbose:
             print(f"Inserting {len(objects)} rows into the '{table_name}' table...")
         with Session(engine) as session:
             for obj in objects:
                 session.add(obj)
+            # add the co-occurrences of the new entities to the entity graph,
+            # in the same transaction as the entities
+            if table_name == "entity" and objects:
+                update_entity_cooccurrence(session, objects, verbose=verbose)
             session.commit()
+
+    # invalidate cached search results now that the data has changed
+    if any(new_db_rows.values()):
+        version = bump_data_version()
+        if verbose:
+            print(f"Knowledge graph data version is now {version}.")
     get_table_sizes(verbose=True)
 
 
@@ -12,6 +12,9 @@ from .settings import VECTOR_LENGTH
 class BaseTable(SQLModel, table=False):
     """Base table class that others inherit from."""
 
+    # large columns that are only loaded from the database when requested
+    DEFERRED_COLUMNS: ClassVar[list[str]] = []
+
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     added_at: datetime = Field(default_factory=lambda: datetime.now())
 
@@ -22,6 +25,8 @@ class BaseTableWithEmbeddings(BaseTable, table=False):
     # set the length of vector embeddings for vector columns
     VECTOR_LENGTH: ClassVar[int] = int(VECTOR_LENGTH)
 
+    DEFERRED_COLUMNS: ClassVar[list[str]] = ["embedding"]
+
     embedding: list[float] | ndarray = Field(sa_type=Vector(VECTOR_LENGTH))
 
     # allow custom ndarray type for vector column
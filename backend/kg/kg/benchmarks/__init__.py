@@ -0,0 +1,7 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Reproducible latency benchmarks of RAG retrieval and the read functions,
+run against a synthetic knowledge graph in a separate benchmark database.
+Run them with `python -m kg.benchmarks --help`.
+"""
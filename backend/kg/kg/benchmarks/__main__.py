@@ -0,0 +1,95 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Load a synthetic knowledge graph into a benchmark database and time retrieval.
+
+Example:
+python -m kg.benchmarks --reports-per-source 500 --output results.json
+"""
+
+import os
+import argparse
+from kg.benchmarks.fake_ml_api import FakeMLAPI
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m kg.benchmarks",
+        description="Benchmark RAG retrieval and read latency on a synthetic corpus.",
+    )
+    parser.add_argument("--db-name", default="kg_benchmark")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--sources", type=int, default=5)
+    parser.add_argument("--reports-per-source", type=int, default=200)
+    parser.add_argument("--excerpts-per-report", type=int, default=10)
+    parser.add_argument("--entities-per-excerpt", type=int, default=2)
+    parser.add_argument("--uentities", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--cases", nargs="*", help="Only run these benchmark cases")
+    parser.add_argument("--output", help="Path of a JSON file to write results to")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    # the benchmark replaces the contents of the database, so never run it
+    # against a database that looks like it holds real data
+    if "benchmark" not in args.db_name:
+        raise ValueError(
+            f"Benchmark database name must contain 'benchmark': {args.db_name}"
+        )
+
+    with FakeMLAPI(vector_length=0) as api:
+        # kg reads its settings and connects to the database when it's imported,
+        # so the environment has to point at the benchmark database and the
+        # fake ML API before any other kg module is imported
+        os.environ["DB_NAME"] = args.db_name
+        os.environ["ML_API_URL"] = api.url
+        from kg.settings import VECTOR_LENGTH
+        from kg.engine import engine
+        from kg.benchmarks.corpus import load_corpus
+        from kg.benchmarks.run import run_benchmarks, write_results
+
+        api.vector_length = VECTOR_LENGTH
+
+        if not args.skip_load:
+            print(f"Loading synthetic corpus into {args.db_name}...")
+            counts = load_corpus(
+                engine,
+                n_sources=args.sources,
+                reports_per_source=args.reports_per_source,
+                excerpts_per_report=args.excerpts_per_report,
+                entities_per_excerpt=args.entities_per_excerpt,
+                n_uentities=args.uentities,
+                seed=args.seed,
+                verbose=True,
+            )
+            print(f"Loaded {counts}")
+
+        results = run_benchmarks(
+            n_trials=args.trials,
+            n_warmup=args.warmup,
+            n_queries=args.queries,
+            cases=args.cases,
+            seed=args.seed,
+            verbose=True,
+        )
+        results["corpus"] = {
+            "sources": args.sources,
+            "reportsPerSource": args.reports_per_source,
+            "excerptsPerReport": args.excerpts_per_report,
+            "entitiesPerExcerpt": args.entities_per_excerpt,
+            "uentities": args.uentities,
+            "loaded": not args.skip_load,
+        }
+        results["mlApiRequests"] = api.n_requests
+        if args.output:
+            write_results(results, args.output)
+            print(f"Wrote results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
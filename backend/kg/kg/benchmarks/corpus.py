@@ -0,0 +1,217 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Generate a synthetic knowledge graph and load it into the benchmark database.
+The corpus is deterministic for a given size and seed: the same sources,
+reports, excerpts, entities and random unit-vector embeddings are created on
+every run, so benchmark results can be compared across runs and machines.
+"""
+
+import numpy as np
+from datetime import date, datetime
+from hashlib import sha256
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, Session
+from kg.tables import Source, Report, Excerpt, UEntity, Entity, EntityCooccurrence
+from kg.indexes import VECTOR_INDEXES, create_indexes
+from kg.utils.version import bump_data_version
+from kg.utils.graph import rebuild_entity_cooccurrence
+from kg.settings import VECTOR_LENGTH
+
+
+# Words that synthetic titles and text are made of, so string and lexical
+# searches have realistic matches
+VOCABULARY = [
+    "grid", "outage", "substation", "transformer", "solar", "wind", "nuclear",
+    "natural", "gas", "pipeline", "pricing", "demand", "storage", "battery",
+    "hydro", "coal", "emissions", "reliability", "resilience", "cyber", "attack",
+    "vulnerability", "firmware", "controller", "scada", "ransomware", "phishing",
+    "advisory", "malware", "network", "operator", "utility", "generation",
+    "transmission", "distribution", "market", "capacity", "forecast", "weather",
+    "wildfire",
+]  # fmt: skip
+
+# Types of synthetic entities
+ENTITY_TYPES = ["organization", "location", "product", "person", "date"]
+
+# Range of publication years of synthetic reports
+FIRST_YEAR, LAST_YEAR = 2000, 2024
+
+# Knowledge graph tables that are replaced by the synthetic corpus. Other tables,
+# like the data version, are kept, so the data version keeps increasing.
+CORPUS_TABLES = [Source, Report, Excerpt, UEntity, Entity, EntityCooccurrence]
+
+# Number of rows inserted per statement
+INSERT_BATCH_SIZE = 1000
+
+
+def random_unit_vectors(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Create random unit vectors with the length of the vector embeddings."""
+    vectors = rng.standard_normal((n, VECTOR_LENGTH)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def random_text(rng: np.random.Generator, n_words: int) -> str:
+    """Create a string of random vocabulary words."""
+    return " ".join(rng.choice(VOCABULARY, size=n_words))
+
+
+def get_source_abbreviation(source_index: int) -> str:
+    """Get the abbreviation of a synthetic data source."""
+    return f"SYN{source_index}"
+
+
+def reset_database(engine: Engine) -> None:
+    """
+    Drop and recreate the knowledge graph tables, without the vector indexes
+    until the data is loaded.
+    """
+    tables = [table.__table__ for table in CORPUS_TABLES]
+    SQLModel.metadata.drop_all(engine, tables=tables)
+    SQLModel.metadata.create_all(engine)
+    # vector indexes are much faster to build once than to update on every insert
+    for index in VECTOR_INDEXES:
+        index.drop(bind=engine, checkfirst=True)
+
+
+def _insert(session: Session, table: SQLModel, rows: list[dict]) -> None:
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        session.execute(insert(table), rows[i : i + INSERT_BATCH_SIZE])
+
+
+def load_corpus(
+    engine: Engine,
+    n_sources: int = 5,
+    reports_per_source: int = 200,
+    excerpts_per_report: int = 10,
+    entities_per_excerpt: int = 2,
+    n_uentities: int = 1000,
+    seed: int = 0,
+    verbose: bool = False,
+) -> dict:
+    """
+    Replace the contents of the database with a synthetic knowledge graph.
+    Each data source is generated from its own random seed and committed
+    separately, so memory use doesn't grow with the number of sources.
+    Returns the number of rows that were loaded into each table.
+    """
+    reset_database(engine)
+    added_at = datetime(2025, 1, 1)
+    counts = {"source": 0, "report": 0, "excerpt": 0, "uentity": 0, "entity": 0}
+
+    rng = np.random.default_rng(seed)
+    uentities = [
+        {
+            "id": f"syn-uentity-{i}",
+            "added_at": added_at,
+            "title": f"{random_text(rng, 2)} {i}",
+            "entity_type": ENTITY_TYPES[i % len(ENTITY_TYPES)],
+            "embedding": embedding,
+        }
+        for i, embedding in enumerate(random_unit_vectors(rng, n_uentities))
+    ]
+    with Session(engine) as session:
+        _insert(session, UEntity, uentities)
+        session.commit()
+    counts["uentity"] = len(uentities)
+
+    for s in range(n_sources):
+        rng = np.random.default_rng([seed, s])
+        source_id = f"syn-source-{s}"
+        abbreviation = get_source_abbreviation(s)
+        reports, excerpts, entities = [], [], []
+        years = rng.integers(FIRST_YEAR, LAST_YEAR + 1, size=reports_per_source)
+        report_embeddings = random_unit_vectors(rng, reports_per_source)
+        for r in range(reports_per_source):
+            report_id = f"syn-report-{s}-{r}"
+            published_at = date(int(years[r]), 1 + r % 12, 1 + r % 28)
+            title = f"{abbreviation} {random_text(rng, 5)} report {r}"
+            reports.append(
+                {
+                    "id": report_id,
+                    "added_at": added_at,
+                    "embedding": report_embeddings[r],
+                    "source_id": source_id,
+                    # identifiers look like CVE IDs, so identifier lookups can be benchmarked
+                    "identifier": f"CVE-{years[r]}-{s:02d}{r:04d}",
+                    "title": title,
+                    "report_type": "synthetic",
+                    "report_metadata": {"keywords": random_text(rng, 3).split()},
+                    "n_excerpts": excerpts_per_report,
+                    "description": random_text(rng, 20),
+                    "sha256hash": sha256(report_id.encode()).hexdigest(),
+                    "version": 0,
+                    "published_at": published_at,
+                }
+            )
+            excerpt_embeddings = random_unit_vectors(rng, excerpts_per_report)
+            for e in range(excerpts_per_report):
+                excerpt_id = f"syn-excerpt-{s}-{r}-{e}"
+                excerpts.append(
+                    {
+                        "id": excerpt_id,
+                        "added_at": added_at,
+                        "embedding": excerpt_embeddings[e],
+                        "report_id": report_id,
+                        "source_id": source_id,
+                        "title": f"{title} part {e}",
+                        "content_type": "text",
+                        "json_content": None,
+                        "description": random_text(rng, 10),
+                        "excerpt_index": e,
+                        "text_content": random_text(rng, 120),
+                        "published_at": published_at,
+                    }
+                )
+                for n in range(entities_per_excerpt):
+                    uentity = uentities[int(rng.integers(n_uentities))]
+                    entities.append(
+                        {
+                            "id": f"syn-entity-{s}-{r}-{e}-{n}",
+                            "added_at": added_at,
+                            "uentity_id": uentity["id"],
+                            "report_id": report_id,
+                            "source_id": source_id,
+                            "excerpt_id": excerpt_id,
+                            "title": uentity["title"],
+                            "entity_type": uentity["entity_type"],
+                            "published_at": published_at,
+                        }
+                    )
+
+        with Session(engine) as session:
+            _insert(
+                session,
+                Source,
+                [
+                    {
+                        "id": source_id,
+                        "added_at": added_at,
+                        "title": f"Synthetic source {s}",
+                        "description": random_text(rng, 15),
+                        "abbreviation": abbreviation,
+                        "uri": None,
+                    }
+                ],
+            )
+            _insert(session, Report, reports)
+            _insert(session, Excerpt, excerpts)
+            _insert(session, Entity, entities)
+            session.commit()
+        counts["source"] += 1
+        counts["report"] += len(reports)
+        counts["excerpt"] += len(excerpts)
+        counts["entity"] += len(entities)
+        if verbose:
+            print(f"Loaded synthetic source {s + 1} of {n_sources}.")
+
+    rebuild_entity_cooccurrence(engine, verbose=verbose)
+    if verbose:
+        print("Building indexes...")
+    create_indexes(engine)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+    bump_data_version()
+    return counts
@@ -0,0 +1,91 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Local stand-in for the machine learning API, which serves deterministic
+random unit vectors from the `create-embeddings` route, so benchmarks
+don't depend on a model server or its latency.
+"""
+
+import json
+import threading
+import numpy as np
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_embedding(text: str, vector_length: int) -> list[float]:
+    """
+    Create a random unit vector that is always the same for the same text.
+
+    Example:
+    fake_embedding("grid outages", 384) == fake_embedding("grid outages", 384)
+    # returns True
+    """
+    seed = int.from_bytes(sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(vector_length)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeMLAPI:
+    """
+    Fake ML API that runs in a background thread.
+
+    Example:
+    with FakeMLAPI(vector_length=384) as api:
+        os.environ["ML_API_URL"] = api.url
+    """
+
+    def __init__(self, vector_length: int, host: str = "127.0.0.1", port: int = 0):
+        self.vector_length = vector_length
+        self.n_requests = 0
+        handler = self._create_handler()
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="fake-ml-api", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        """Root URL of the API, in the same form as the ML_API_URL setting."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _create_handler(self) -> type[BaseHTTPRequestHandler]:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip("/") != "/create-embeddings":
+                    self.send_error(404)
+                    return
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                inputs = json.loads(body)["inputs"]
+                api.n_requests += 1
+                response = json.dumps(
+                    [fake_embedding(text, api.vector_length) for text in inputs]
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                # don't print a line for every request
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeMLAPI":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "FakeMLAPI":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,182 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Time RAG retrieval modes and read functions against the benchmark database,
+and summarize their latencies as percentiles.
+"""
+
+import json
+import platform
+import numpy as np
+from time import perf_counter
+from datetime import datetime
+from typing import Callable
+from sqlmodel import Session, select
+from kg.engine import engine
+from kg.tables import Source, Report, Excerpt
+from kg.utils.search import rag_retrieval
+from kg.utils.read import (
+    get_table_sizes,
+    list_objects,
+    get_object,
+    list_data_sources,
+    get_data_overview,
+)
+from kg.benchmarks.corpus import VOCABULARY
+from kg import settings
+
+
+# Settings that change search performance, which are recorded with the results
+RECORDED_SETTINGS = [
+    "VECTOR_LENGTH",
+    "VECTOR_INDEX_TYPE",
+    "HNSW_M",
+    "HNSW_EF_CONSTRUCTION",
+    "IVFFLAT_LISTS",
+    "VECTOR_ITERATIVE_SCAN",
+    "VECTOR_QUANTIZATION",
+    "QUANTIZED_RERANK_FACTOR",
+    "USE_ANN_ACCELERATOR",
+    "DB_POOL_SIZE",
+    "RAG_STAGE_WORKERS",
+    "MMR_POOL_FACTOR",
+    "GRAPH_EXPANSION_NEIGHBORS",
+]
+
+
+def get_queries(n_queries: int, seed: int = 0) -> list[str]:
+    """Create deterministic search queries from the synthetic corpus vocabulary."""
+    rng = np.random.default_rng(seed)
+    return [
+        " ".join(rng.choice(VOCABULARY, size=int(rng.integers(2, 6))))
+        for _ in range(n_queries)
+    ]
+
+
+def summarize(seconds: list[float]) -> dict:
+    """Summarize latencies in milliseconds."""
+    ms = np.array(seconds) * 1000
+    return {
+        "n": len(ms),
+        "meanMs": round(float(ms.mean()), 3),
+        "minMs": round(float(ms.min()), 3),
+        "p50Ms": round(float(np.percentile(ms, 50)), 3),
+        "p95Ms": round(float(np.percentile(ms, 95)), 3),
+        "p99Ms": round(float(np.percentile(ms, 99)), 3),
+        "maxMs": round(float(ms.max()), 3),
+    }
+
+
+def time_case(function: Callable[[int], object], n_trials: int, n_warmup: int):
+    """
+    Time a benchmark case. The function is called with the trial number,
+    and warmup trials are run first without being timed.
+    """
+    for trial in range(n_warmup):
+        function(trial)
+    seconds = []
+    for trial in range(n_trials):
+        start = perf_counter()
+        function(n_warmup + trial)
+        seconds.append(perf_counter() - start)
+    return seconds
+
+
+def check_rag_results(results: dict) -> dict:
+    """
+    Fail a RAG benchmark case when a stage of the search failed, so a broken
+    search path is reported instead of being timed as a fast one.
+    """
+    if results.get("failedStages"):
+        raise RuntimeError(f"RAG search stages failed: {results['failedStages']}")
+    return results
+
+
+def get_cases(queries: list[str]) -> dict[str, Callable[[int], object]]:
+    """
+    Get the benchmark cases, by name. RAG searches skip the result cache,
+    except in the cache hit case, so every trial runs the full search.
+    """
+    with Session(engine) as session:
+        source = session.exec(select(Source).order_by(Source.abbreviation)).first()
+        report = session.exec(
+            select(Report.title, Report.identifier)
+            .where(Report.source_id == source.id)
+            .order_by(Report.id)
+        ).first()
+        excerpt_id = session.exec(select(Excerpt.id).order_by(Excerpt.id)).first()
+
+    def query(trial: int) -> str:
+        return queries[trial % len(queries)]
+
+    def rag(**kwargs) -> Callable[[int], object]:
+        kwargs.setdefault("use_cache", False)
+        return lambda trial: check_rag_results(rag_retrieval(query(trial), **kwargs))
+
+    return {
+        "rag_diversity_0": rag(diversity=0.0),
+        "rag_diversity_0.5": rag(diversity=0.5),
+        "rag_diversity_1": rag(diversity=1.0),
+        "rag_mmr_0.5": rag(diversity=0.5, diversity_mode="mmr"),
+        "rag_hybrid": rag(search_mode="hybrid"),
+        "rag_graph_expansion": rag(graph_expansion=5),
+        "rag_date_filter": rag(earliest_year=2010, latest_year=2015),
+        "rag_dataset_filter": rag(dataset=source.abbreviation),
+        "rag_report": rag(dataset=source.abbreviation, report=report.title),
+        "rag_identifier": lambda trial: rag_retrieval(
+            report.identifier, use_cache=False
+        ),
+        "rag_cache_hit": lambda trial: rag_retrieval(queries[0]),
+        "read_list_reports": lambda trial: list_objects("report", page=trial % 10),
+        "read_list_excerpts": lambda trial: list_objects(
+            "excerpt", page=trial % 10, page_size=50
+        ),
+        "read_object": lambda trial: get_object("excerpt", excerpt_id),
+        "read_data_sources": lambda trial: list_data_sources(),
+        "read_data_overview": lambda trial: get_data_overview(),
+    }
+
+
+def run_benchmarks(
+    n_trials: int = 50,
+    n_warmup: int = 5,
+    n_queries: int = 20,
+    cases: list[str] | None = None,
+    seed: int = 0,
+    verbose: bool = False,
+) -> dict:
+    """
+    Run the benchmark cases and summarize their latencies.
+    Optionally only run the cases with the given names.
+    """
+    all_cases = get_cases(get_queries(n_queries, seed))
+    results = {}
+    for name, function in all_cases.items():
+        if cases and name not in cases:
+            continue
+        summary = summarize(time_case(function, n_trials, n_warmup))
+        results[name] = summary
+        if verbose:
+            print(
+                f"{name:<22} p50 {summary['p50Ms']:>9.2f} ms"
+                f"   p95 {summary['p95Ms']:>9.2f} ms"
+                f"   p99 {summary['p99Ms']:>9.2f} ms"
+            )
+    return {
+        "startedAt": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {name: getattr(settings, name) for name in RECORDED_SETTINGS},
+        "tableSizes": get_table_sizes(),
+        "nTrials": n_trials,
+        "nWarmup": n_warmup,
+        "nQueries": n_queries,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def write_results(results: dict, path: str) -> None:
+    """Write benchmark results to a JSON file."""
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
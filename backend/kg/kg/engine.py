@@ -2,7 +2,15 @@
 
 from sqlalchemy import text
 from sqlmodel import create_engine
-from .settings import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
+from .settings import (
+    DB_USER,
+    DB_PASSWORD,
+    DB_HOST,
+    DB_PORT,
+    DB_NAME,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+)
 
 
 DEFAULT_DB_URI = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/postgres"
@@ -22,10 +30,16 @@ with admin_engine.connect() as conn:
         conn.execute(text(f"CREATE DATABASE {DB_NAME}"))
 
 # Now we use the newly-created database as our engine
-engine = create_engine(DB_URI, echo=False)
+engine = create_engine(
+    DB_URI,
+    echo=False,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+)
 
 # Install required extensions in the new database
-EXTENSIONS = ["vector"]
+EXTENSIONS = ["vector", "pg_trgm"]
 with engine.connect() as conn:
     for ext in EXTENSIONS:
         conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {ext}"))
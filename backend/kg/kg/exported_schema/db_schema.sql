@@ -41,6 +41,8 @@ CREATE TABLE excerpt (
 	description TEXT, 
 	excerpt_index INTEGER, 
 	text_content TEXT, 
+	published_at DATE, 
+	search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', coalesce(description, '') || ' ' || coalesce(text_content, ''))) STORED, 
 	PRIMARY KEY (id), 
 	FOREIGN KEY(report_id) REFERENCES report (id), 
 	FOREIGN KEY(source_id) REFERENCES source (id)
@@ -65,9 +67,38 @@ CREATE TABLE entity (
 	excerpt_id VARCHAR NOT NULL, 
 	title TEXT, 
 	entity_type TEXT, 
+	published_at DATE, 
 	PRIMARY KEY (id), 
 	FOREIGN KEY(uentity_id) REFERENCES uentity (id), 
 	FOREIGN KEY(report_id) REFERENCES report (id), 
 	FOREIGN KEY(source_id) REFERENCES source (id), 
 	FOREIGN KEY(excerpt_id) REFERENCES excerpt (id)
+);
+
+CREATE TABLE embeddingcache (
+	id VARCHAR NOT NULL, 
+	added_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, 
+	embedding VECTOR(384) NOT NULL, 
+	model_id TEXT, 
+	text TEXT, 
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE dataversion (
+	id VARCHAR NOT NULL, 
+	added_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, 
+	version INTEGER, 
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE entitycooccurrence (
+	id VARCHAR NOT NULL, 
+	added_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, 
+	uentity_id VARCHAR NOT NULL, 
+	other_uentity_id VARCHAR NOT NULL, 
+	n_excerpts INTEGER, 
+	excerpt_ids TEXT[], 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(uentity_id) REFERENCES uentity (id), 
+	FOREIGN KEY(other_uentity_id) REFERENCES uentity (id)
 );
\ No newline at end of file
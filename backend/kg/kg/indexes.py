@@ -0,0 +1,248 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Define secondary database indexes on the knowledge graph tables,
+including approximate nearest neighbor (ANN) indexes on vector embeddings
+and on compact (quantized) copies of excerpt embeddings,
+trigram indexes for string search, identifier indexes for exact lookups,
+full text search indexes and entity co-occurrence graph indexes.
+
+Indexes defined here are attached to the table metadata, so they are created
+along with new tables, and `create_indexes` adds any that are missing from
+tables which already exist.
+"""
+
+import math
+from pgvector.sqlalchemy import HALFVEC, BIT, VECTOR
+from sqlalchemy import Index, text, cast
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, Session, func, select
+from kg.tables import Report, Excerpt, UEntity, Entity, EntityCooccurrence
+from kg.settings import (
+    VECTOR_INDEX_TYPE,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    IVFFLAT_LISTS,
+    VECTOR_ITERATIVE_SCAN,
+    VECTOR_QUANTIZATION,
+    VECTOR_LENGTH,
+)
+
+
+# Tables with vector embeddings that are searched by cosine distance
+VECTOR_TABLES = [Report, Excerpt, UEntity]
+
+# Operator class that matches the `cosine_distance` comparator used for search
+VECTOR_OPCLASS = "vector_cosine_ops"
+
+
+# Tables with compact copies of their embeddings, for a coarse first search pass
+QUANTIZED_VECTOR_TABLES = [Excerpt]
+
+# Operator classes of the quantized embeddings, by quantization type
+QUANTIZED_OPCLASSES = {
+    "halfvec": "halfvec_cosine_ops",
+    "binary": "bit_hamming_ops",
+}
+
+
+def get_vector_build_params() -> dict:
+    """Get the build parameters of the configured vector index type."""
+    if VECTOR_INDEX_TYPE == "ivfflat":
+        return {"lists": IVFFLAT_LISTS}
+    elif VECTOR_INDEX_TYPE == "hnsw":
+        return {"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION}
+    raise ValueError(f"Invalid vector index type: '{VECTOR_INDEX_TYPE}'.")
+
+
+def vector_index(table: SQLModel) -> Index:
+    """Create the ANN index definition for the embedding column of a table."""
+    return Index(
+        f"ix_{table.__tablename__}_embedding_{VECTOR_INDEX_TYPE}",
+        table.embedding,
+        postgresql_using=VECTOR_INDEX_TYPE,
+        postgresql_with=get_vector_build_params(),
+        postgresql_ops={"embedding": VECTOR_OPCLASS},
+    )
+
+
+def quantize_embedding(
+    embedding: ColumnElement | list[float],
+    quantization: str = VECTOR_QUANTIZATION,
+) -> ColumnElement:
+    """
+    Get the compact representation of an embedding column or query embedding:
+    half precision floats ("halfvec"), or one sign bit per dimension ("binary").
+    """
+    if isinstance(embedding, list):
+        embedding = cast(embedding, VECTOR(VECTOR_LENGTH))
+    if quantization == "halfvec":
+        return cast(embedding, HALFVEC(VECTOR_LENGTH))
+    elif quantization == "binary":
+        return cast(func.binary_quantize(embedding), BIT(VECTOR_LENGTH))
+    raise ValueError(f"Invalid vector quantization: '{quantization}'.")
+
+
+def quantized_distance(
+    table: SQLModel,
+    query_embedding: list[float],
+    quantization: str = VECTOR_QUANTIZATION,
+) -> ColumnElement:
+    """
+    Get the approximate distance between the quantized embeddings of a table and
+    a query embedding, which can be ordered by using the quantized vector index.
+    """
+    embedding = quantize_embedding(table.embedding, quantization)
+    query = quantize_embedding(query_embedding, quantization)
+    if quantization == "binary":
+        return embedding.hamming_distance(query)
+    return embedding.cosine_distance(query)
+
+
+def quantized_vector_index(table: SQLModel, quantization: str) -> Index:
+    """
+    Create the ANN index definition for the quantized embeddings of a table.
+    The index is on an expression, so no extra column needs to be stored.
+    """
+    label = f"embedding_{quantization}"
+    return Index(
+        f"ix_{table.__tablename__}_{label}_{VECTOR_INDEX_TYPE}",
+        quantize_embedding(table.embedding, quantization).label(label),
+        postgresql_using=VECTOR_INDEX_TYPE,
+        postgresql_with=get_vector_build_params(),
+        postgresql_ops={label: QUANTIZED_OPCLASSES[quantization]},
+    )
+
+
+VECTOR_INDEXES = [vector_index(table) for table in VECTOR_TABLES]
+if VECTOR_QUANTIZATION != "none":
+    VECTOR_INDEXES += [
+        quantized_vector_index(table, VECTOR_QUANTIZATION)
+        for table in QUANTIZED_VECTOR_TABLES
+    ]
+
+# Indexes for filtering excerpts and entities by date without a join to reports
+DATE_INDEXES = [
+    Index("ix_excerpt_published_at", Excerpt.published_at),
+    Index("ix_entity_published_at", Entity.published_at),
+]
+
+# Operator class for trigram indexes (pg_trgm), which support substring
+# matching with LIKE/ILIKE and ranking by trigram similarity
+TRIGRAM_OPCLASS = "gin_trgm_ops"
+
+
+def trigram_index(table: SQLModel, column: str) -> Index:
+    """Create the GIN trigram index definition for a text column of a table."""
+    return Index(
+        f"ix_{table.__tablename__}_{column}_trgm",
+        getattr(table, column),
+        postgresql_using="gin",
+        postgresql_ops={column: TRIGRAM_OPCLASS},
+    )
+
+
+# Indexes for string search over report titles and identifiers
+TRIGRAM_INDEXES = [
+    trigram_index(Report, "title"),
+    trigram_index(Report, "identifier"),
+]
+
+# Indexes for exact lookups of identifiers, like CVE IDs and EIA series IDs.
+# The excerpt title index also supports prefix matches (LIKE 'prefix%').
+IDENTIFIER_INDEXES = [
+    Index("ix_report_identifier", Report.identifier),
+    Index(
+        "ix_excerpt_title_pattern",
+        Excerpt.title,
+        postgresql_ops={"title": "text_pattern_ops"},
+    ),
+]
+
+# Index for lexical (full text) search over excerpts
+TEXT_SEARCH_INDEXES = [
+    Index(
+        "ix_excerpt_search_vector",
+        Excerpt.search_vector,
+        postgresql_using="gin",
+    ),
+]
+
+# Index for finding the most frequently co-occurring entities of an entity
+GRAPH_INDEXES = [
+    Index(
+        "ix_entitycooccurrence_uentity_id_n_excerpts",
+        EntityCooccurrence.uentity_id,
+        EntityCooccurrence.n_excerpts.desc(),
+    ),
+]
+
+# All indexes managed by this module
+INDEXES = [
+    *VECTOR_INDEXES,
+    *DATE_INDEXES,
+    *TRIGRAM_INDEXES,
+    *IDENTIFIER_INDEXES,
+    *TEXT_SEARCH_INDEXES,
+    *GRAPH_INDEXES,
+]
+
+
+def create_indexes(engine: Engine, verbose: bool = False) -> None:
+    """Create any managed indexes that don't exist yet."""
+    for index in INDEXES:
+        if verbose:
+            print(f"Creating index '{index.name}' if it doesn't exist...")
+        index.create(bind=engine, checkfirst=True)
+
+
+def reindex_vector_indexes(engine: Engine, verbose: bool = False) -> None:
+    """
+    Rebuild the vector indexes. IVFFlat indexes choose their list centroids
+    from the rows that exist when the index is built, so they should be
+    rebuilt after a large data ingestion. HNSW indexes don't need this.
+    """
+    with engine.connect() as conn:
+        for index in VECTOR_INDEXES:
+            if verbose:
+                print(f"Rebuilding index '{index.name}'...")
+            conn.execute(text(f"REINDEX INDEX {index.name}"))
+        conn.commit()
+
+
+def set_vector_search_params(
+    session: Session,
+    max_count: int = 15,
+    recall: float = 0.5,
+) -> None:
+    """
+    Tune the vector index scan for the rest of the current transaction.
+    The size of the HNSW candidate list (`hnsw.ef_search`) or the number of
+    IVFFlat lists (`ivfflat.probes`) that are searched grows with the number
+    of requested results and with `recall`, which trades latency (0.0)
+    for search accuracy (1.0).
+
+    Iterative index scans (pgvector 0.8.0+) are enabled according to the
+    VECTOR_ITERATIVE_SCAN setting, so filtered searches keep scanning the
+    index until enough rows pass the filters instead of losing results.
+    """
+    recall = min(max(float(recall), 0.0), 1.0)
+    if VECTOR_INDEX_TYPE == "ivfflat":
+        setting = "ivfflat.probes"
+        value = math.ceil(
+            math.sqrt(IVFFLAT_LISTS) * (0.5 + 1.5 * recall) * max(1, max_count / 40)
+        )
+        value = min(value, IVFFLAT_LISTS)
+    else:
+        setting = "hnsw.ef_search"
+        value = min(1000, max(40, math.ceil(max_count * (1 + 9 * recall))))
+    session.exec(select(func.set_config(setting, str(value), True)))
+
+    if VECTOR_ITERATIVE_SCAN != "off":
+        # IVFFlat indexes only support relaxed ordering for iterative scans
+        if VECTOR_INDEX_TYPE == "ivfflat":
+            setting, value = "ivfflat.iterative_scan", "relaxed_order"
+        else:
+            setting, value = "hnsw.iterative_scan", VECTOR_ITERATIVE_SCAN
+        session.exec(select(func.set_config(setting, value, True)))
@@ -2,12 +2,14 @@
 
 import os
 from sqlmodel import SQLModel
-from sqlalchemy.schema import CreateTable
+from sqlalchemy.schema import CreateTable, CreateColumn
 from sqlalchemy.engine import Engine
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text
 
 from kg.engine import engine
+from kg.indexes import create_indexes
 from kg.utils.read import get_table_sizes
+from kg.utils.graph import rebuild_entity_cooccurrence
 
 
 # Build a path for exporting the database schema
@@ -24,8 +26,21 @@ def initialize_tables(schema_path: str | None = None):
     Optionally export the table schema to a DBML file.
     """
     # create all the tables
+    has_cooccurrence_table = inspect(engine).has_table("entitycooccurrence")
     SQLModel.metadata.create_all(engine)
 
+    # add columns that are missing from tables which already existed
+    added_columns = add_missing_columns(engine)
+    if {("excerpt", "published_at"), ("entity", "published_at")} & added_columns:
+        sync_published_at(engine)
+
+    # backfill the entity co-occurrence graph from entities that already existed
+    if not has_cooccurrence_table:
+        rebuild_entity_cooccurrence(engine, verbose=True)
+
+    # add indexes that are missing from tables which already existed
+    create_indexes(engine)
+
     # export schema to DBML and SQL files
     if schema_path:
         if not os.path.exists(schema_path):
@@ -36,6 +51,55 @@ def initialize_tables(schema_path: str | None = None):
     print("Database tables initialized.")
 
 
+def add_missing_columns(engine: Engine) -> set[tuple[str, str]]:
+    """
+    Add columns that are defined in the table schema but are missing
+    from existing database tables. New columns must be nullable or
+    generated so that existing rows remain valid.
+    Returns the set of (table name, column name) pairs that were added.
+    """
+    inspector = inspect(engine)
+    added_columns = set()
+    with engine.connect() as conn:
+        for table_name in inspector.get_table_names():
+            table = SQLModel.metadata.tables.get(table_name)
+            if table is None:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table_name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    print(f"Adding column '{column.name}' to the '{table_name}' table.")
+                    conn.execute(
+                        text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}")
+                    )
+                    added_columns.add((table_name, column.name))
+        conn.commit()
+    return added_columns
+
+
+def sync_published_at(engine: Engine) -> None:
+    """
+    Copy the published_at date of each report onto its excerpts and entities.
+    Data ingestion keeps these in sync for new rows, so this is only needed
+    to backfill rows that were inserted before the columns existed.
+    """
+    with engine.connect() as conn:
+        for table_name in ["excerpt", "entity"]:
+            print(f"Syncing published_at dates on the '{table_name}' table.")
+            conn.execute(
+                text(
+                    f"""
+                    UPDATE {table_name} SET published_at = report.published_at
+                    FROM report
+                    WHERE {table_name}.report_id = report.id
+                    AND {table_name}.published_at IS DISTINCT FROM report.published_at
+                    """
+                )
+            )
+        conn.commit()
+
+
 def export_dbml_schema(engine: Engine, schema_path: str) -> None:
     """Export the database schema to DBML."""
     dbml_content = ""
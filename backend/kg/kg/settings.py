@@ -1,6 +1,7 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Locate this package's .env file so we aren't reading from the .env file
@@ -20,3 +21,107 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+# Identifier of the embedding model served by the ML API. Cached query
+# embeddings are keyed on this so they are never reused across models.
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "all-MiniLM-L6-v2")
+
+# In-process query embedding cache limits
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 4096))
+EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", 86400))
+
+# Flag for sharing cached query embeddings across API replicas through the database
+EMBEDDING_CACHE_SHARED = os.getenv("EMBEDDING_CACHE_SHARED", "True") == "True"
+
+# Number of seconds that the knowledge graph data version is cached in each
+# process before it's read from the database again
+DATA_VERSION_REFRESH_SECONDS = float(os.getenv("DATA_VERSION_REFRESH_SECONDS", 5))
+
+# In-process RAG result cache limits
+RAG_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", 512))
+RAG_CACHE_TTL_SECONDS = int(os.getenv("RAG_CACHE_TTL_SECONDS", 86400))
+
+# In-process semantic RAG result cache, which reuses the results of an earlier query
+# with the same filters when the cosine similarity of the query embeddings is at least
+# RAG_SEMANTIC_CACHE_THRESHOLD. A size of 0 disables it.
+RAG_SEMANTIC_CACHE_SIZE = int(os.getenv("RAG_SEMANTIC_CACHE_SIZE", 256))
+RAG_SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("RAG_SEMANTIC_CACHE_TTL_SECONDS", 3600))
+RAG_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("RAG_SEMANTIC_CACHE_THRESHOLD", 0.95))
+
+# Type of approximate nearest neighbor index on vector embeddings ("hnsw" or "ivfflat")
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()
+
+# Build parameters of the vector indexes
+HNSW_M = int(os.getenv("HNSW_M", 16))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", 64))
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", 100))
+
+# Iterative vector index scans for filtered searches ("strict_order", "relaxed_order"
+# or "off"). Requires pgvector 0.8.0 or later.
+VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "strict_order").lower()
+
+# Database connection pool limits. RAG retrieval runs its stages concurrently,
+# so each search can hold several connections at once.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+
+# Number of threads that run RAG retrieval stages concurrently, shared by all searches.
+# It's capped at half of DB_POOL_SIZE + DB_MAX_OVERFLOW, so stages can't use up the pool.
+RAG_STAGE_WORKERS = int(os.getenv("RAG_STAGE_WORKERS", 16))
+
+# Maximum number of seconds to wait for each RAG retrieval stage
+RAG_STAGE_TIMEOUT_SECONDS = float(os.getenv("RAG_STAGE_TIMEOUT_SECONDS", 30))
+
+# Size of the candidate pool for MMR diversity re-ranking, as a multiple of the
+# number of requested results
+MMR_POOL_FACTOR = int(os.getenv("MMR_POOL_FACTOR", 5))
+
+# Minimum trigram similarity between a requested report name and a report title
+# for the title to be matched without comparing vector embeddings
+REPORT_TITLE_MATCH_THRESHOLD = float(os.getenv("REPORT_TITLE_MATCH_THRESHOLD", 0.6))
+
+# Fraction of RAG searches that are logged (searches with failed stages are always logged)
+RAG_LOG_SAMPLE_RATE = float(os.getenv("RAG_LOG_SAMPLE_RATE", 0.05))
+
+# Level of the API logs, like the sampled RAG search summaries (INFO) or per-search details (DEBUG)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Search excerpt embeddings in process, from memory-mapped files that are exported
+# for each data version. Searches use the database until the files are ready.
+USE_ANN_ACCELERATOR = os.getenv("USE_ANN_ACCELERATOR", "False") == "True"
+
+# Directory of the exported excerpt vector files, shared by the API workers on a host
+ANN_INDEX_DIR = os.getenv(
+    "ANN_INDEX_DIR", os.path.join(tempfile.gettempdir(), "kg_ann_index")
+)
+
+# Compact copy of excerpt embeddings that is indexed for a coarse first search pass,
+# before an exact re-rank by full precision cosine distance ("none", "halfvec" or
+# "binary"). Requires pgvector 0.7.0 or later.
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+
+# Number of candidates from the coarse search pass that are re-ranked,
+# as a multiple of the number of requested results
+QUANTIZED_RERANK_FACTOR = int(os.getenv("QUANTIZED_RERANK_FACTOR", 4))
+
+# Number of threads that run the searches of batch RAG retrieval requests concurrently,
+# and the maximum number of searches in one batch
+RAG_BATCH_WORKERS = int(os.getenv("RAG_BATCH_WORKERS", 4))
+RAG_BATCH_MAX_SEARCHES = int(os.getenv("RAG_BATCH_MAX_SEARCHES", 20))
+
+# Number of excerpt IDs that are kept for each pair of co-occurring entities,
+# most recent first
+ENTITY_COOCCURRENCE_MAX_EXCERPTS = int(
+    os.getenv("ENTITY_COOCCURRENCE_MAX_EXCERPTS", 20)
+)
+
+# Number of most frequently co-occurring entities that RAG graph expansion follows
+GRAPH_EXPANSION_NEIGHBORS = int(os.getenv("GRAPH_EXPANSION_NEIGHBORS", 10))
+
+# Comma-separated entity types that RAG graph expansion doesn't follow, like dates,
+# which co-occur with almost every entity and would crowd out the specific neighbors
+GRAPH_EXPANSION_EXCLUDED_ENTITY_TYPES = [
+    t.strip().upper()
+    for t in os.getenv("GRAPH_EXPANSION_EXCLUDED_ENTITY_TYPES", "DATE").split(",")
+    if t.strip()
+]
@@ -7,8 +7,8 @@ Define the database table schema using Python classes.
 from datetime import date
 from typing import ClassVar, Optional
 from sqlmodel import Field, Column, Field, Relationship
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import Text, String, INT, Date
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
+from sqlalchemy import Text, String, INT, Date, Computed
 
 from kg.base_tables import BaseTable, BaseTableWithEmbeddings
 
@@ -35,6 +35,7 @@ class Report(BaseTableWithEmbeddings, table=True):
     """
 
     RELATIONS: ClassVar[list[str]] = ["source", "excerpts"]
+    DEFERRED_COLUMNS: ClassVar[list[str]] = ["embedding", "report_metadata"]
 
     source_id: str = Field(foreign_key="source.id", index=True)
     identifier: str = Field(sa_column=Column(Text))
@@ -55,6 +56,10 @@ class Report(BaseTableWithEmbeddings, table=True):
     entities: list["Entity"] = Relationship(back_populates="report")
 
 
+# Text search configuration used for lexical search over excerpts
+TEXT_SEARCH_CONFIG = "english"
+
+
 class Excerpt(BaseTableWithEmbeddings, table=True):
     """
     Excerpt (chunk) of text or numerical data from an original data report.
@@ -62,6 +67,11 @@ class Excerpt(BaseTableWithEmbeddings, table=True):
     """
 
     RELATIONS: ClassVar[list[str]] = ["source", "report", "entities"]
+    DEFERRED_COLUMNS: ClassVar[list[str]] = [
+        "embedding",
+        "json_content",
+        "search_vector",
+    ]
 
     report_id: str = Field(foreign_key="report.id", index=True)
     source_id: str = Field(foreign_key="source.id", index=True)
@@ -73,6 +83,23 @@ class Excerpt(BaseTableWithEmbeddings, table=True):
     text_content: Optional[str] = Field(
         default=None, sa_column=Column(Text, nullable=True)
     )
+    # copy of the parent report's published_at for date filtering without a join
+    published_at: Optional[date] = Field(
+        default=None, sa_column=Column(Date, nullable=True)
+    )
+    # full text search document, generated by the database from the description
+    # and text content, so it's never written by the ORM and is deferred on reads
+    search_vector: Optional[str] = Field(
+        default=None,
+        sa_column=Column(
+            TSVECTOR,
+            Computed(
+                f"to_tsvector('{TEXT_SEARCH_CONFIG}', "
+                "coalesce(description, '') || ' ' || coalesce(text_content, ''))",
+                persisted=True,
+            ),
+        ),
+    )
 
     source: Source = Relationship(back_populates="excerpts")
     report: Report = Relationship(back_populates="excerpts")
@@ -106,6 +133,10 @@ class Entity(BaseTable, table=True):
     excerpt_id: str = Field(foreign_key="excerpt.id", index=True)
     title: str = Field(sa_column=Column(Text))
     entity_type: str = Field(sa_column=Column(Text))
+    # copy of the parent report's published_at for date filtering without a join
+    published_at: Optional[date] = Field(
+        default=None, sa_column=Column(Date, nullable=True)
+    )
 
     source: Source = Relationship(back_populates="entities")
     report: Report = Relationship(back_populates="entities")
@@ -113,6 +144,43 @@ class Entity(BaseTable, table=True):
     uentity: UEntity = Relationship(back_populates="entities")
 
 
+class EntityCooccurrence(BaseTable, table=True):
+    """
+    Pair of unique entities that are extracted from the same excerpts, with the
+    number of those excerpts and the IDs of the most recent ones. Each pair is
+    stored in both directions, so the entities that co-occur with an entity are
+    found with a single index lookup. This table is derived from the entity
+    table and is updated during data ingestion.
+    """
+
+    uentity_id: str = Field(foreign_key="uentity.id")
+    other_uentity_id: str = Field(foreign_key="uentity.id")
+    n_excerpts: int = Field(sa_column=Column(INT))
+    excerpt_ids: list[str] = Field(sa_column=Column(ARRAY(Text)))
+
+
+class EmbeddingCache(BaseTableWithEmbeddings, table=True):
+    """
+    Vector embeddings of search queries, shared by all API replicas.
+    The ID is a hash of the embedding model ID and the normalized query text.
+    This is an operational table and is not part of the knowledge graph.
+    """
+
+    model_id: str = Field(sa_column=Column(Text))
+    text: str = Field(sa_column=Column(Text))
+
+
+class DataVersion(BaseTable, table=True):
+    """
+    Version counter of the knowledge graph data, which is incremented
+    every time data ingestion commits new rows. Caches of search results
+    are tagged with this version so they expire when the data changes.
+    This is an operational table and is not part of the knowledge graph.
+    """
+
+    version: int = Field(default=0, sa_column=Column(INT))
+
+
 '''
 class MLModel(BaseTable, table=True):
     """Single AI/ML model."""
@@ -0,0 +1,267 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Optional in-process vector search over excerpt embeddings.
+
+The excerpt IDs, data source IDs, publication years and normalized embeddings are
+exported from the database into NumPy files for each data version. API workers
+memory-map these files, so all workers on a host share one copy in the page cache,
+and top matches are found with exact NumPy search. Postgres is then only used to
+load the winning excerpts.
+
+Files are exported in the background when a worker first sees a new data version,
+or by data ingestion after it commits. Searches fall back to the database until the
+files for the current data version are ready.
+"""
+
+import os
+import json
+import shutil
+import threading
+import numpy as np
+from time import time
+from numpy.lib.format import open_memmap
+from sqlmodel import Session, select, func
+from kg.engine import engine
+from kg.tables import Excerpt, Source
+from kg.utils.version import get_data_version
+from kg.settings import ANN_INDEX_DIR, VECTOR_LENGTH
+
+
+# Number of excerpts that are read from the database at a time during export
+EXPORT_BATCH_SIZE = 10000
+
+# Seconds after which an export lock is assumed to belong to a crashed export
+EXPORT_LOCK_TIMEOUT_SECONDS = 3600
+
+
+def get_export_path(version: int, directory: str = ANN_INDEX_DIR) -> str:
+    """Get the directory of the exported excerpt vectors for a data version."""
+    return os.path.join(directory, f"excerpt_vectors_v{version}")
+
+
+def export_excerpt_vectors(
+    version: int | None = None,
+    directory: str = ANN_INDEX_DIR,
+    verbose: bool = False,
+) -> str:
+    """
+    Export the excerpt vectors of a data version into memory-mappable NumPy files.
+    Files are written to a temporary directory that is renamed when complete,
+    so readers never see a partial export. Exports of older versions are removed.
+    Returns the directory of the export.
+    """
+    version = get_data_version(refresh=True) if version is None else version
+    path = get_export_path(version, directory)
+    if os.path.isdir(path):
+        return path
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp_path, exist_ok=True)
+
+    # read the sources, the row count and the rows from one snapshot, so the exported
+    # vectors and IDs agree even if excerpts are ingested during the export
+    snapshot_engine = engine.execution_options(isolation_level="REPEATABLE READ")
+    with Session(snapshot_engine) as session:
+        source_ids = sorted(session.exec(select(Source.id)).all())
+        n_rows = session.exec(select(func.count(Excerpt.id))).one()
+        id_length = session.exec(select(func.max(func.length(Excerpt.id)))).one()
+        source_codes = {source_id: i for i, source_id in enumerate(source_ids)}
+
+        embeddings = open_memmap(
+            os.path.join(tmp_path, "embeddings.npy"),
+            mode="w+",
+            dtype=np.float32,
+            shape=(n_rows, VECTOR_LENGTH),
+        )
+        ids = np.empty(n_rows, dtype=f"<U{id_length or 1}")
+        sources = np.empty(n_rows, dtype=np.int32)
+        # publication years, or 0 for excerpts without a publication date
+        years = np.zeros(n_rows, dtype=np.int16)
+
+        query = select(
+            Excerpt.id, Excerpt.source_id, Excerpt.published_at, Excerpt.embedding
+        ).order_by(Excerpt.id)
+        n_exported = 0
+        for row in session.execute(
+            query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        ):
+            ids[n_exported] = row.id
+            sources[n_exported] = source_codes.get(row.source_id, -1)
+            years[n_exported] = row.published_at.year if row.published_at else 0
+            embeddings[n_exported] = row.embedding
+            n_exported += 1
+
+    # normalize embeddings so cosine similarity is a dot product
+    embeddings = embeddings[:n_exported]
+    embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    embeddings.flush()
+    np.save(os.path.join(tmp_path, "ids.npy"), ids[:n_exported])
+    np.save(os.path.join(tmp_path, "sources.npy"), sources[:n_exported])
+    np.save(os.path.join(tmp_path, "years.npy"), years[:n_exported])
+    with open(os.path.join(tmp_path, "source_ids.json"), "w") as f:
+        json.dump(source_ids, f)
+    del embeddings
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # another process finished the same export first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    remove_old_exports(version, directory)
+    if verbose:
+        print(f"Exported {n_exported} excerpt vectors to {path}.")
+    return path
+
+
+def remove_old_exports(version: int, directory: str = ANN_INDEX_DIR) -> None:
+    """Remove exports of data versions that are older than the given version."""
+    for name in os.listdir(directory):
+        if not name.startswith("excerpt_vectors_v"):
+            continue
+        try:
+            old_version = int(name.removeprefix("excerpt_vectors_v").split(".")[0])
+        except ValueError:
+            continue
+        if old_version < version:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def _normalize(embedding: list[float]) -> np.ndarray:
+    embedding = np.asarray(embedding, dtype=np.float32)
+    return embedding / max(np.linalg.norm(embedding), 1e-12)
+
+
+class ExcerptVectors:
+    """Memory-mapped excerpt vectors of a single data version."""
+
+    def __init__(self, path: str, version: int):
+        self.version = version
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.sources = np.load(os.path.join(path, "sources.npy"), mmap_mode="r")
+        self.years = np.load(os.path.join(path, "years.npy"), mmap_mode="r")
+        with open(os.path.join(path, "source_ids.json")) as f:
+            self.source_codes = {s: i for i, s in enumerate(json.load(f))}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def top_k(
+        self,
+        query_embedding: list[float],
+        k: int,
+        source_ids: list[str] | None = None,
+        earliest_year: int | str = None,
+        latest_year: int | str = None,
+        max_distance: float | None = None,
+    ) -> np.ndarray:
+        """
+        Get the positions of the k excerpts that are closest to the query embedding
+        by cosine distance, in order, optionally filtered by data source, by
+        publication year, and by a maximum cosine distance.
+        """
+        scores = self.embeddings @ _normalize(query_embedding)
+
+        mask = np.ones(len(self), dtype=bool)
+        if max_distance is not None:
+            mask &= scores >= 1.0 - max_distance
+        if source_ids is not None:
+            codes = [self.source_codes[s] for s in source_ids if s in self.source_codes]
+            mask &= np.isin(self.sources, codes)
+        if earliest_year or latest_year:
+            mask &= self.years > 0
+        if earliest_year:
+            mask &= self.years >= int(earliest_year)
+        if latest_year:
+            mask &= self.years <= int(latest_year)
+        scores[~mask] = -np.inf
+
+        k = min(k, int(mask.sum()))
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def cosine_distances(
+        self, query_embedding: list[float], positions: np.ndarray
+    ) -> np.ndarray:
+        """Get the cosine distances from the query embedding to the given excerpts."""
+        return 1.0 - self.embeddings[positions] @ _normalize(query_embedding)
+
+
+class ExcerptVectorIndex:
+    """
+    Provides the memory-mapped excerpt vectors of the current data version,
+    exporting them in the background when they don't exist yet.
+
+    Example:
+    vectors = EXCERPT_VECTOR_INDEX.get()
+    if vectors is not None:
+        positions = vectors.top_k(query_embedding, k=15)
+        ids = vectors.ids[positions].tolist()
+    """
+
+    def __init__(self, directory: str = ANN_INDEX_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._vectors: ExcerptVectors | None = None
+        self._exporting_version = None
+
+    def get(self) -> ExcerptVectors | None:
+        """
+        Get the excerpt vectors of the current data version,
+        or None if they aren't ready yet.
+        """
+        version = get_data_version()
+        vectors = self._vectors
+        if vectors is not None and vectors.version == version:
+            return vectors
+        path = get_export_path(version, self.directory)
+        if os.path.isdir(path):
+            with self._lock:
+                if self._vectors is None or self._vectors.version != version:
+                    self._vectors = ExcerptVectors(path, version)
+                    print(f"Loaded {len(self._vectors)} excerpt vectors from {path}.")
+                return self._vectors
+        self._start_export(version)
+        return None
+
+    def _start_export(self, version: int) -> None:
+        """Export the vectors of a data version in a background thread."""
+        with self._lock:
+            if self._exporting_version == version:
+                return
+            self._exporting_version = version
+        threading.Thread(
+            target=self._export, args=(version,), name="ann-export", daemon=True
+        ).start()
+
+    def _export(self, version: int) -> None:
+        # only one worker on a host exports each version
+        os.makedirs(self.directory, exist_ok=True)
+        lock_path = get_export_path(version, self.directory) + ".lock"
+        try:
+            if time() - os.path.getmtime(lock_path) > EXPORT_LOCK_TIMEOUT_SECONDS:
+                os.remove(lock_path)
+        except OSError:
+            pass
+        try:
+            lock = os.open(lock_path, os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            # another worker is exporting this version, so allow a retry in case it fails
+            with self._lock:
+                self._exporting_version = None
+            return
+        try:
+            export_excerpt_vectors(version, self.directory, verbose=True)
+        except Exception as e:
+            print(f"Error exporting excerpt vectors: {e}")
+        finally:
+            os.close(lock)
+            os.remove(lock_path)
+            with self._lock:
+                self._exporting_version = None
+
+
+# In-process excerpt vector index shared by all searches in this process
+EXCERPT_VECTOR_INDEX = ExcerptVectorIndex()
@@ -0,0 +1,230 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+In-process caches used by the search and read paths.
+"""
+
+import threading
+import numpy as np
+from time import monotonic
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+# Map of cache name to a function that returns that cache's statistics
+_STATS_REGISTRY: dict[str, Callable[[], dict]] = {}
+
+
+def register_cache_stats(name: str, stats_function: Callable[[], dict]) -> None:
+    """Register a function that reports hit/miss statistics for a named cache."""
+    _STATS_REGISTRY[name] = stats_function
+
+
+def get_cache_stats() -> dict:
+    """Return hit/miss statistics for every registered cache."""
+    return {name: stats_function() for name, stats_function in _STATS_REGISTRY.items()}
+
+
+class HitCounter:
+    """Thread-safe hit/miss counter."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self, n: int = 1) -> None:
+        with self._lock:
+            self.hits += n
+
+    def miss(self, n: int = 1) -> None:
+        with self._lock:
+            self.misses += n
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class TTLCache:
+    """
+    Thread-safe least-recently-used cache where entries also expire
+    after `ttl_seconds`. A `maxsize` of 0 disables the cache.
+
+    Example:
+    cache = TTLCache("query_embedding", maxsize=1024, ttl_seconds=3600)
+    cache.set("key", [0.1, 0.2])
+    cache.get("key")
+    # returns [0.1, 0.2]
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl_seconds: float = 3600):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.counter = HitCounter()
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        register_cache_stats(name, self.stats)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for a key, or `default` if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > monotonic():
+                    self._data.move_to_end(key)
+                    self.counter.hit()
+                    return value
+                del self._data[key]
+        self.counter.miss()
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache a value, evicting the least recently used entry if the cache is full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {**self.counter.stats(), "size": len(self), "maxsize": self.maxsize}
+
+
+class SemanticCache:
+    """
+    Thread-safe cache of values that are looked up by embedding. A lookup returns
+    the value of the most similar cached embedding with the same key, if their
+    cosine similarity is at least `threshold`, so near-duplicate queries share a
+    cached value. The embeddings are kept in a small matrix, so a lookup is one
+    matrix-vector product. Entries expire after `ttl_seconds`, and the least
+    recently used entry is replaced when the cache is full.
+    A `maxsize` of 0 disables the cache.
+
+    Example:
+    cache = SemanticCache("rag_semantic", maxsize=256, threshold=0.95)
+    cache.set([0.6, 0.8], "filters", "results")
+    cache.get([0.61, 0.79], "filters")
+    # returns ("results", 0.9999...)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 256,
+        ttl_seconds: float = 3600,
+        threshold: float = 0.95,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.counter = HitCounter()
+        self._lock = threading.Lock()
+        # the embedding matrix is allocated when the first entry is cached,
+        # once the length of the embeddings is known
+        self._embeddings: np.ndarray | None = None
+        self._expires_at = np.zeros(maxsize)
+        self._last_used = np.zeros(maxsize)
+        self._keys: list[Hashable] = [None] * maxsize
+        self._values: list[Any] = [None] * maxsize
+        self._slots_by_key: dict[Hashable, set[int]] = {}
+        register_cache_stats(name, self.stats)
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32)
+        return embedding / max(np.linalg.norm(embedding), 1e-12)
+
+    def get(
+        self, embedding: list[float], key: Hashable, default: Any = None
+    ) -> tuple[Any, float] | Any:
+        """
+        Return the cached value of the most similar embedding with the same key,
+        and its similarity, or `default` if no unexpired entry is similar enough.
+        """
+        with self._lock:
+            now = monotonic()
+            slots = [
+                slot
+                for slot in self._slots_by_key.get(key, ())
+                if self._expires_at[slot] > now
+            ]
+            if slots:
+                similarities = self._embeddings[slots] @ self._normalize(embedding)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    slot = slots[best]
+                    self._last_used[slot] = now
+                    self.counter.hit()
+                    return self._values[slot], float(similarities[best])
+        self.counter.miss()
+        return default
+
+    def set(self, embedding: list[float], key: Hashable, value: Any) -> None:
+        """Cache a value, replacing an expired or the least recently used entry."""
+        if self.maxsize <= 0:
+            return
+        embedding = self._normalize(embedding)
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros(
+                    (self.maxsize, len(embedding)), dtype=np.float32
+                )
+            now = monotonic()
+            expired = np.flatnonzero(self._expires_at <= now)
+            if len(expired):
+                slot = int(expired[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+            self._remove(slot)
+            self._embeddings[slot] = embedding
+            self._expires_at[slot] = now + self.ttl_seconds
+            self._last_used[slot] = now
+            self._keys[slot] = key
+            self._values[slot] = value
+            self._slots_by_key.setdefault(key, set()).add(slot)
+
+    def _remove(self, slot: int) -> None:
+        key = self._keys[slot]
+        slots = self._slots_by_key.get(key)
+        if slots is not None:
+            slots.discard(slot)
+            if not slots:
+                del self._slots_by_key[key]
+        self._expires_at[slot] = 0.0
+        self._keys[slot] = None
+        self._values[slot] = None
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            for slot in range(self.maxsize):
+                self._remove(slot)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._expires_at > monotonic()))
+
+    def stats(self) -> dict:
+        return {
+            **self.counter.stats(),
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+        }
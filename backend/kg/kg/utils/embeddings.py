@@ -2,7 +2,33 @@
 
 import sys
 import requests
-from ..settings import ML_API_URL
+from datetime import datetime
+from hashlib import sha256
+from sqlmodel import Session, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert
+from ..settings import (
+    ML_API_URL,
+    EMBEDDING_MODEL_ID,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_CACHE_TTL_SECONDS,
+    EMBEDDING_CACHE_SHARED,
+)
+from kg.engine import engine
+from kg.tables import EmbeddingCache
+from kg.utils.cache import TTLCache, HitCounter, register_cache_stats
+
+
+# First cache tier: query embeddings held in this process
+QUERY_EMBEDDING_CACHE = TTLCache(
+    "query_embedding",
+    maxsize=EMBEDDING_CACHE_SIZE,
+    ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS,
+)
+
+# Second cache tier: query embeddings shared by all replicas through the database
+SHARED_EMBEDDING_CACHE_COUNTER = HitCounter()
+register_cache_stats("query_embedding_shared", SHARED_EMBEDDING_CACHE_COUNTER.stats)
 
 
 def create_embeddings(inputs: list[str]) -> list[list[float]]:
@@ -16,3 +42,97 @@ def create_embeddings(inputs: list[str]) -> list[list[float]]:
         print(f"Error occurred while creating embeddings: {e}")
         print("Failed to create embeddings via the ML API. Is it running?")
         sys.exit(1)
+
+
+def normalize_query_text(text: str) -> str:
+    """Collapse whitespace so trivially different queries share a cache entry."""
+    return " ".join(str(text).split())
+
+
+def get_query_cache_key(text: str) -> str:
+    """Get the cache key of a query string for the configured embedding model."""
+    return sha256(f"{EMBEDDING_MODEL_ID}\n{text}".encode("utf-8")).hexdigest()
+
+
+def embed_queries(queries: list[str]) -> list[list[float]]:
+    """
+    Create vector embeddings for search queries, using the query embedding
+    caches before calling the ML API. All queries that miss both cache tiers
+    are embedded in a single ML API call.
+    Use `create_embeddings` instead for documents that are being ingested.
+    """
+    texts = [normalize_query_text(q) for q in queries]
+    keys = [get_query_cache_key(t) for t in texts]
+
+    # check the in-process cache
+    embeddings = {}
+    for key in set(keys):
+        embedding = QUERY_EMBEDDING_CACHE.get(key)
+        if embedding is not None:
+            embeddings[key] = embedding
+
+    # check the shared database cache
+    missing = {k: t for k, t in zip(keys, texts) if k not in embeddings}
+    if missing and EMBEDDING_CACHE_SHARED:
+        shared = _read_shared_embeddings(list(missing))
+        SHARED_EMBEDDING_CACHE_COUNTER.hit(len(shared))
+        SHARED_EMBEDDING_CACHE_COUNTER.miss(len(missing) - len(shared))
+        for key, embedding in shared.items():
+            QUERY_EMBEDDING_CACHE.set(key, embedding)
+            embeddings[key] = embedding
+            del missing[key]
+
+    # embed everything that is left using the ML API
+    if missing:
+        new_embeddings = dict(zip(missing, create_embeddings(list(missing.values()))))
+        for key, embedding in new_embeddings.items():
+            QUERY_EMBEDDING_CACHE.set(key, embedding)
+        if EMBEDDING_CACHE_SHARED:
+            _write_shared_embeddings(new_embeddings, missing)
+        embeddings.update(new_embeddings)
+
+    return [embeddings[key] for key in keys]
+
+
+def embed_query(query: str) -> list[float]:
+    """Create the vector embedding for a single search query."""
+    return embed_queries([query])[0]
+
+
+def _read_shared_embeddings(keys: list[str]) -> dict[str, list[float]]:
+    """Read cached query embeddings from the database."""
+    try:
+        with Session(engine) as session:
+            rows = session.exec(
+                select(EmbeddingCache.id, EmbeddingCache.embedding).where(
+                    EmbeddingCache.id.in_(keys)
+                )
+            ).all()
+        return {row.id: row.embedding.tolist() for row in rows}
+    except SQLAlchemyError as e:
+        print(f"Error reading shared embedding cache: {e}")
+        return {}
+
+
+def _write_shared_embeddings(
+    embeddings: dict[str, list[float]], texts: dict[str, str]
+) -> None:
+    """Write new query embeddings to the database cache."""
+    values = [
+        {
+            "id": key,
+            "model_id": EMBEDDING_MODEL_ID,
+            "text": texts[key],
+            "embedding": embedding,
+            "added_at": datetime.now(),
+        }
+        for key, embedding in embeddings.items()
+    ]
+    try:
+        with Session(engine) as session:
+            session.execute(
+                insert(EmbeddingCache).values(values).on_conflict_do_nothing()
+            )
+            session.commit()
+    except SQLAlchemyError as e:
+        print(f"Error writing shared embedding cache: {e}")
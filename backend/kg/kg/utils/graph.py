@@ -0,0 +1,159 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Maintain the entity co-occurrence graph: pairs of unique entities that are
+extracted from the same excerpts. New pairs are added incrementally when
+entities are ingested, so the graph never needs to be computed by joining
+the entity table to itself at search time.
+"""
+
+import itertools
+from datetime import datetime
+from collections import defaultdict
+from sqlalchemy import Text, any_, literal_column, text, type_coerce
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, insert
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, func, select
+from kg.tables import Entity, EntityCooccurrence, Excerpt
+from kg.settings import ENTITY_COOCCURRENCE_MAX_EXCERPTS
+
+
+# Number of co-occurrence rows upserted per statement
+UPSERT_BATCH_SIZE = 1000
+
+
+def get_cooccurrence_id(uentity_id: str, other_uentity_id: str) -> str:
+    """Get the ID of the co-occurrence row of a pair of unique entities."""
+    return f"{uentity_id}:{other_uentity_id}"
+
+
+def get_cooccurrences(entities: list[Entity]) -> dict[tuple[str, str], list[str]]:
+    """
+    Find the pairs of unique entities that are extracted from the same excerpts,
+    in both directions, and the IDs of the excerpts that each pair shares,
+    most recently published first.
+
+    Example:
+    get_cooccurrences([Entity(uentity_id="a", excerpt_id="e1"),
+                       Entity(uentity_id="b", excerpt_id="e1")])
+    # returns {("a", "b"): ["e1"], ("b", "a"): ["e1"]}
+    """
+    uentity_ids_by_excerpt = defaultdict(set)
+    published_at_by_excerpt = {}
+    for entity in entities:
+        uentity_ids_by_excerpt[entity.excerpt_id].add(entity.uentity_id)
+        published_at_by_excerpt[entity.excerpt_id] = entity.published_at
+    # excerpts without a publication date go last, like NULLS LAST in SQL
+    excerpt_ids = sorted(
+        uentity_ids_by_excerpt,
+        key=lambda i: (
+            published_at_by_excerpt[i] is not None,
+            published_at_by_excerpt[i] or 0,
+            i,
+        ),
+        reverse=True,
+    )
+    cooccurrences = defaultdict(list)
+    for excerpt_id in excerpt_ids:
+        uentity_ids = uentity_ids_by_excerpt[excerpt_id]
+        for pair in itertools.permutations(sorted(uentity_ids), 2):
+            cooccurrences[pair].append(excerpt_id)
+    return cooccurrences
+
+
+def update_entity_cooccurrence(
+    session: Session, entities: list[Entity], verbose: bool = False
+) -> int:
+    """
+    Add the co-occurrences of newly ingested entities to the co-occurrence graph.
+    Pairs that already exist have their excerpt counts incremented, and the IDs of
+    the new excerpts are merged into their excerpt IDs, which are kept in order of
+    publication, most recent first, and limited to ENTITY_COOCCURRENCE_MAX_EXCERPTS.
+    The entities must be from new excerpts, so their co-occurrences aren't counted
+    twice. The session isn't committed here.
+    Returns the number of entity pairs that were added or updated.
+    """
+    cooccurrences = get_cooccurrences(entities)
+    if verbose:
+        print(f"Updating {len(cooccurrences)} entity co-occurrences...")
+    added_at = datetime.now()
+    rows = [
+        {
+            "id": get_cooccurrence_id(uentity_id, other_uentity_id),
+            "added_at": added_at,
+            "uentity_id": uentity_id,
+            "other_uentity_id": other_uentity_id,
+            "n_excerpts": len(excerpt_ids),
+            "excerpt_ids": excerpt_ids[:ENTITY_COOCCURRENCE_MAX_EXCERPTS],
+        }
+        for (uentity_id, other_uentity_id), excerpt_ids in cooccurrences.items()
+    ]
+    table = EntityCooccurrence.__table__
+    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+        statement = insert(table).values(rows[i : i + UPSERT_BATCH_SIZE])
+        # order the new and existing excerpt IDs of a pair by the excerpts' publication
+        # (written out, since the subquery can't be correlated to the upserted row)
+        merged_ids = literal_column(
+            f"excluded.excerpt_ids || {table.name}.excerpt_ids", ARRAY(Text)
+        )
+        order = aggregate_order_by(
+            Excerpt.id, Excerpt.published_at.desc().nulls_last(), Excerpt.id.desc()
+        )
+        excerpt_ids = type_coerce(
+            select(func.array_agg(order))
+            .where(Excerpt.id == any_(merged_ids))
+            .scalar_subquery(),
+            ARRAY(Text),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={
+                "n_excerpts": table.c.n_excerpts + statement.excluded.n_excerpts,
+                "excerpt_ids": excerpt_ids[1:ENTITY_COOCCURRENCE_MAX_EXCERPTS],
+            },
+        )
+        session.execute(statement)
+    return len(rows)
+
+
+def rebuild_entity_cooccurrence(engine: Engine, verbose: bool = False) -> None:
+    """
+    Rebuild the whole co-occurrence graph from the entity table.
+    Data ingestion keeps the graph up to date, so this is only needed to
+    backfill entities that were inserted before the graph existed.
+    """
+    if verbose:
+        print("Rebuilding the entity co-occurrence graph...")
+    with engine.connect() as conn:
+        conn.execute(text("TRUNCATE TABLE entitycooccurrence"))
+        conn.execute(
+            text(
+                """
+                -- an entity can be extracted more than once from an excerpt, so
+                -- reduce the entities to distinct excerpt and unique entity pairs
+                -- first, or the excerpt would be counted and listed repeatedly
+                WITH pairs AS (
+                    SELECT excerpt_id, uentity_id, max(published_at) AS published_at
+                    FROM entity
+                    GROUP BY excerpt_id, uentity_id
+                )
+                INSERT INTO entitycooccurrence
+                    (id, added_at, uentity_id, other_uentity_id, n_excerpts, excerpt_ids)
+                SELECT
+                    a.uentity_id || ':' || b.uentity_id,
+                    now(),
+                    a.uentity_id,
+                    b.uentity_id,
+                    count(*),
+                    (array_agg(
+                        a.excerpt_id ORDER BY a.published_at DESC NULLS LAST, a.excerpt_id DESC
+                    ))[1:(:max_excerpts)]
+                FROM pairs a
+                JOIN pairs b
+                ON a.excerpt_id = b.excerpt_id AND a.uentity_id <> b.uentity_id
+                GROUP BY a.uentity_id, b.uentity_id
+                """
+            ),
+            {"max_excerpts": ENTITY_COOCCURRENCE_MAX_EXCERPTS},
+        )
+        conn.commit()
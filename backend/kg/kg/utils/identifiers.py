@@ -0,0 +1,56 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Recognize search queries that are made up of literal identifiers, like CVE IDs,
+CISA ICS advisory IDs and EIA series IDs, which can be answered by exact lookups
+instead of semantic search.
+"""
+
+import re
+
+
+# Patterns of identifiers that are stored as report identifiers or excerpt titles
+IDENTIFIER_PATTERNS = {
+    # CVE IDs, like CVE-2024-1234
+    "cve": re.compile(r"CVE-\d{4}-\d{4,}"),
+    # CISA ICS and ICS medical advisory IDs, like ICSA-25-056-01
+    "icsa": re.compile(r"ICSM?A-\d{2}-\d{3}-\d{2}[A-Z]?"),
+    # EIA series IDs, like ELEC.GEN.ALL-AK-99.A or PET.RWTC.D: a dataset prefix of
+    # at least two letters, a series name of at least two characters, optional
+    # further segments, and a frequency suffix (annual, quarterly, monthly, ...)
+    "eia_series": re.compile(
+        r"[A-Z]{2,}(?:_[A-Z]+)?\.[A-Z0-9][A-Z0-9_\-]+"
+        r"(?:\.[A-Z0-9][A-Z0-9_\-]*)*\.(?:A|Q|M|W|D|H|HL)"
+    ),
+}
+
+# Characters that separate identifiers in a query
+IDENTIFIER_SEPARATORS = re.compile(r"[\s,;]+")
+
+# Punctuation that is allowed around identifiers in a query
+IDENTIFIER_PUNCTUATION = "\"'()[]?!:."
+
+
+def parse_identifiers(query: str) -> list[str]:
+    """
+    Get the identifiers in a search query, if the query consists only of
+    identifiers. Returns an empty list if any part of the query isn't an identifier.
+
+    Example:
+    parse_identifiers("cve-2024-1234, ICSA-25-056-01")
+    # returns ["CVE-2024-1234", "ICSA-25-056-01"]
+    parse_identifiers("What is CVE-2024-1234?")
+    # returns []
+    parse_identifiers("U.S.A")
+    # returns [], dotted abbreviations aren't EIA series IDs
+    """
+    identifiers = []
+    for token in IDENTIFIER_SEPARATORS.split(query.strip()):
+        token = token.strip(IDENTIFIER_PUNCTUATION).upper()
+        if not token:
+            continue
+        if not any(p.fullmatch(token) for p in IDENTIFIER_PATTERNS.values()):
+            return []
+        if token not in identifiers:
+            identifiers.append(token)
+    return identifiers
@@ -0,0 +1,119 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Prometheus metrics for the knowledge graph search and read paths,
+and sampled structured logging of RAG searches.
+"""
+
+import json
+import random
+import logging
+from prometheus_client import Histogram, Gauge, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from kg.engine import engine
+from kg.utils.cache import get_cache_stats
+from kg.settings import RAG_LOG_SAMPLE_RATE
+
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from cache hits up to slow database scans
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "kg_stage_seconds",
+    "Time spent in each stage of a search.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+RAG_SECONDS = Histogram(
+    "kg_rag_seconds",
+    "Total time of RAG retrieval searches.",
+    ["cache"],
+    buckets=LATENCY_BUCKETS,
+)
+
+RAG_RESULTS = Histogram(
+    "kg_rag_results",
+    "Number of excerpts and reports returned by RAG retrieval searches.",
+    ["kind"],
+    buckets=(0, 1, 5, 10, 15, 25, 50, 100, 250, 500, 1000),
+)
+
+REQUEST_SECONDS = Histogram(
+    "kg_api_request_seconds",
+    "Time to respond to API requests, by route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "kg_db_pool_connections",
+    "Database connections in the engine pool, by state.",
+    ["state"],
+)
+DB_POOL_CONNECTIONS.labels("checked_out").set_function(lambda: engine.pool.checkedout())
+DB_POOL_CONNECTIONS.labels("checked_in").set_function(lambda: engine.pool.checkedin())
+# the pool reports negative overflow until all of its base connections are open
+DB_POOL_CONNECTIONS.labels("overflow").set_function(
+    lambda: max(engine.pool.overflow(), 0)
+)
+DB_POOL_CONNECTIONS.labels("pool_size").set_function(lambda: engine.pool.size())
+
+
+class CacheStatsCollector:
+    """Expose the hit/miss statistics of the registered in-process caches."""
+
+    def collect(self):
+        hits = CounterMetricFamily(
+            "kg_cache_hits", "Cache hits, by cache.", labels=["cache"]
+        )
+        misses = CounterMetricFamily(
+            "kg_cache_misses", "Cache misses, by cache.", labels=["cache"]
+        )
+        size = GaugeMetricFamily(
+            "kg_cache_entries", "Entries in each cache.", labels=["cache"]
+        )
+        for name, stats in get_cache_stats().items():
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            if "size" in stats:
+                size.add_metric([name], stats["size"])
+        yield from (hits, misses, size)
+
+
+REGISTRY.register(CacheStatsCollector())
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record the time spent in a stage of a search."""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_rag_results(results: dict, seconds: float, cached: bool) -> None:
+    """Record the latency and result sizes of a RAG search."""
+    RAG_SECONDS.labels("hit" if cached else "miss").observe(seconds)
+    RAG_RESULTS.labels("excerpts").observe(len(results.get("excerpts", [])))
+    RAG_RESULTS.labels("reports").observe(len(results.get("reports", [])))
+
+
+def log_rag_results(results: dict) -> None:
+    """
+    Log a one-line JSON summary of a RAG search, without the search results.
+    Only a RAG_LOG_SAMPLE_RATE fraction of searches are logged,
+    except for searches where a stage failed, which are always logged.
+    """
+    if not results.get("failedStages") and random.random() >= RAG_LOG_SAMPLE_RATE:
+        return
+    summary = {
+        "event": "rag_retrieval",
+        "query": results.get("query"),
+        "diversity": results.get("diversity"),
+        "excerpts": len(results.get("excerpts", [])),
+        "reports": len(results.get("reports", [])),
+        "ragElapsedSeconds": results.get("ragElapsedSeconds"),
+        "stageElapsedSeconds": results.get("stageElapsedSeconds"),
+        "failedStages": results.get("failedStages"),
+    }
+    logger.info(json.dumps(summary, default=str))
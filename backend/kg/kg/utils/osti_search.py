@@ -8,13 +8,7 @@ from pydantic import BaseModel
 from typing import Union
 from time import time
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s.%(msecs)03d [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 session = requests.Session()
 retries = Retry(
@@ -89,7 +83,7 @@ def search_osti(payload: SearchOSTIPayload) -> dict:
     report_dicts, excerpt_dicts = convert_to_rag_format(candidate_records)
 
     elapsed_seconds = round(time() - start_time, 2)
-    print(f"RAG search total time: {elapsed_seconds} seconds")
+    logger.debug(f"OSTI RAG search total time: {elapsed_seconds} seconds")
 
     return_results: dict = {
         "query": payload.query_params["q"],
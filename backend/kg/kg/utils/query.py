@@ -0,0 +1,70 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Helpers for building queries that only load the columns a response needs.
+Large columns, like vector embeddings and JSONB documents, are listed in
+each table's DEFERRED_COLUMNS and are not fetched unless explicitly included.
+Columns that aren't loaded are left out of serialized objects.
+"""
+
+from typing import Iterable
+from sqlmodel import SQLModel, select
+from sqlalchemy.orm import defer, load_only
+
+
+def deferred_load_options(table: SQLModel, include: Iterable[str] = ()) -> list:
+    """
+    Get loader options that defer the large columns of a table,
+    except for the large columns listed in `include`.
+
+    Example:
+    query = select(Excerpt).options(
+        *deferred_load_options(Excerpt, include={"json_content"})
+    )
+    # loads every excerpt column except the embedding
+    """
+    include = set(include)
+    return [
+        defer(getattr(table, column))
+        for column in table.DEFERRED_COLUMNS
+        if column not in include
+    ]
+
+
+def embedding_deferred_options(table: SQLModel) -> list:
+    """
+    Get loader options that only defer the vector columns of a table:
+    the embedding and, for excerpts, the full text search vector.
+    """
+    include = set(table.DEFERRED_COLUMNS) - {"embedding", "search_vector"}
+    return deferred_load_options(table, include=include)
+
+
+def get_invalid_columns(table: SQLModel, columns: Iterable[str]) -> list[str]:
+    """Get the sorted names in `columns` that aren't fields of a table."""
+    return sorted(set(columns) - set(table.model_fields))
+
+
+def projection_load_options(table: SQLModel, columns: Iterable[str]) -> list:
+    """Get loader options that only load the given columns (and the ID) of a table."""
+    columns = {"id", *columns}
+    invalid_columns = get_invalid_columns(table, columns)
+    if invalid_columns:
+        raise ValueError(f"Invalid column names: {invalid_columns}.")
+    return [load_only(*[getattr(table, c) for c in columns])]
+
+
+def select_table(
+    table: SQLModel,
+    include: Iterable[str] = (),
+    columns: Iterable[str] | None = None,
+) -> select:
+    """
+    Select rows from a table without loading its large columns.
+    If `columns` is provided, only those columns are loaded.
+    Otherwise, all columns are loaded except for the large columns
+    that aren't listed in `include`.
+    """
+    if columns:
+        return select(table).options(*projection_load_options(table, columns))
+    return select(table).options(*deferred_load_options(table, include=include))
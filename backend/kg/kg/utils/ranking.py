@@ -0,0 +1,126 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Combine and reorder ranked search results.
+"""
+
+import numpy as np
+from collections import defaultdict
+
+
+# Rank offset for reciprocal rank fusion, which dampens the influence
+# of the top few ranks of any single result list
+RRF_K = 60
+
+# Smallest drop below a straight line between the highest and lowest similarity
+# scores that counts as a knee point, so evenly spread scores have no knee
+KNEE_MIN_DROP = 0.02
+
+
+def reciprocal_rank_fusion(
+    result_lists: list[list[dict]],
+    key: str = "id",
+    k: int = RRF_K,
+    max_count: int | None = None,
+) -> list[dict]:
+    """
+    Merge ranked result lists with reciprocal rank fusion (RRF).
+    Each result scores 1 / (k + rank) in every list it appears in, and results
+    are returned in order of their total score. Results that are found by
+    several searches rise to the top, without needing the scores of the
+    different searches to be comparable.
+
+    Example:
+    reciprocal_rank_fusion([[{"id": "a"}, {"id": "b"}], [{"id": "b"}]])
+    # returns [{"id": "b"}, {"id": "a"}]
+    """
+    scores = defaultdict(float)
+    results = {}
+    for result_list in result_lists:
+        for rank, result in enumerate(result_list, start=1):
+            scores[result[key]] += 1.0 / (k + rank)
+            # keep the first copy of each result
+            results.setdefault(result[key], result)
+    # sorting is stable, so ties keep the order of the first list
+    ranked = sorted(results, key=lambda result_key: scores[result_key], reverse=True)
+    return [results[result_key] for result_key in ranked[:max_count]]
+
+
+def maximal_marginal_relevance(
+    query_embedding: list[float],
+    embeddings: list[list[float]],
+    lambda_mult: float = 0.5,
+    max_count: int = 15,
+) -> list[int]:
+    """
+    Select results by maximal marginal relevance (MMR). Each step selects the
+    candidate embedding that maximizes
+        lambda_mult * similarity to the query
+        - (1 - lambda_mult) * highest similarity to an already selected candidate,
+    so a `lambda_mult` of 1.0 ranks purely by relevance, and lower values
+    increasingly penalize results that are redundant with each other.
+    Similarities are cosine similarities.
+    Returns the indices of the selected embeddings, in order of selection.
+
+    Example:
+    maximal_marginal_relevance([1, 0], [[1, 0], [1, 0.01], [0.7, 0.7]], 0.3, 2)
+    # returns [0, 2]
+    """
+    if len(embeddings) == 0 or max_count <= 0:
+        return []
+    embeddings = np.array(embeddings, dtype=np.float32)
+    embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    query = np.array(query_embedding, dtype=np.float32)
+    query /= max(np.linalg.norm(query), 1e-12)
+
+    relevance = embeddings @ query
+    # highest similarity of each candidate to any selected candidate
+    redundancy = np.full(len(embeddings), -np.inf, dtype=np.float32)
+    available = np.ones(len(embeddings), dtype=bool)
+    selected = []
+    for _ in range(min(max_count, len(embeddings))):
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        index = int(np.argmax(scores))
+        selected.append(index)
+        available[index] = False
+        redundancy = np.maximum(redundancy, embeddings @ embeddings[index])
+    return selected
+
+
+def similarity_score(cosine_distance: float) -> float:
+    """
+    Convert a cosine distance, from 0.0 to 2.0, into a similarity score
+    from 1.0 (same direction) to 0.0 (opposite direction).
+
+    Example:
+    similarity_score(0.5)
+    # returns 0.75
+    """
+    return 1.0 - float(cosine_distance) / 2.0
+
+
+def find_knee_index(scores: list[float], min_drop: float = KNEE_MIN_DROP) -> int | None:
+    """
+    Find the knee point of similarity scores sorted from highest to lowest:
+    the score that falls furthest below a straight line from the first score
+    to the last score, where the scores stop dropping quickly and level off
+    into a tail of weak matches. Returns None if there are fewer than three
+    scores, or if no score falls at least `min_drop` below the line.
+
+    Example:
+    find_knee_index([0.9, 0.88, 0.6, 0.58, 0.57, 0.56])
+    # returns 2
+    """
+    if len(scores) < 3:
+        return None
+    scores = np.asarray(scores, dtype=np.float64)
+    line = np.linspace(scores[0], scores[-1], len(scores))
+    drops = line - scores
+    index = int(np.argmax(drops))
+    if drops[index] < min_drop:
+        return None
+    return index
@@ -9,6 +9,12 @@ from kg.table_index import TableIndex
 from kg.engine import engine
 from kg.tables import Source, Entity, Report, Excerpt
 from kg.utils.serialize import process_relationships, serialize_with_type
+from kg.utils.sources import SOURCE_REGISTRY
+from kg.utils.query import (
+    deferred_load_options,
+    embedding_deferred_options,
+    select_table,
+)
 
 
 def get_table_sizes(verbose: bool = False) -> dict:
@@ -28,33 +34,21 @@ def get_table_sizes(verbose: bool = False) -> dict:
 def get_data_source_id(data_source_abbreviation: str) -> str:
     """
     Get the data source ID from the data source abbreviation.
+    Sources are looked up in the in-process source registry.
     Example:
     id = get_data_source_id("ARC")
     # returns 2c3f7ad4-6df6-4dad-8b39-c9580f8cf188
     """
-    error_msg = f"No '{data_source_abbreviation}' data source exists database."
-    with Session(engine) as session:
-        row = session.exec(
-            select(Source).where(
-                Source.abbreviation == data_source_abbreviation.upper()
-            )
-        ).first()
-    source_id = getattr(row, "id", None)
-    if source_id:
-        return source_id
-    else:
-        raise ValueError(error_msg)
+    return SOURCE_REGISTRY.get_id(data_source_abbreviation)
 
 
-def get_all_data_source_ids(session) -> list[str]:
+def get_all_data_source_ids(session=None) -> list[str]:
     """
-    From the database session,
-    return a set of all the data source IDs.
-    Use this inside a session that's already open.
+    Return a sorted list of all the data source IDs.
+    Sources are looked up in the in-process source registry, so the
+    `session` argument is no longer used, and only kept for compatibility.
     """
-    query = select(Source.id)
-    results = session.exec(query).all()
-    return sorted(results)
+    return SOURCE_REGISTRY.get_ids()
 
 
 def count_reports_by_source(verbose: bool = False) -> dict:
@@ -118,6 +112,7 @@ def get_excerpts_from_reports(reports: list[dict], max_count: int = 8) -> list[d
         # Join the subquery back to Excerpt on matching "id"
         rows = (
             session.query(Excerpt)
+            .options(*deferred_load_options(Excerpt, include={"json_content"}))
             .join(subq, Excerpt.id == subq.c.id)
             .filter(subq.c.row_number <= max_count)
             .all()
@@ -139,10 +134,7 @@ def get_last_report_version(report_identifier: str) -> int:
 
 def list_data_sources() -> list[dict]:
     """List all top-level data sources"""
-    with Session(engine) as session:
-        result = session.exec(select(Source))
-        rows = result.unique().all()
-        return [serialize_with_type(row, "source") for row in rows]
+    return SOURCE_REGISTRY.list_serialized()
 
 
 def get_data_overview() -> list[dict]:
@@ -179,16 +171,20 @@ def list_objects(
     constraint_val: str = None,
     page: int = 0,
     page_size: int = 10,
+    columns: list[str] | None = None,
 ) -> dict:
     """
     Return a list of database objects.
     Optionally add a key-value constraint for filtering the objects.
+    Optionally provide a list of columns so that only those columns are
+    loaded and returned. By default, all columns except the large columns
+    (embeddings and JSONB documents) are returned.
     Returns pagination details for listing the objects.
     """
 
     table = TableIndex.get_table(table_name)
     with Session(engine) as session:
-        query = select(table)
+        query = select_table(table, columns=columns)
         # enforce constraints
         if constraint_key and constraint_val:
             query = query.where(getattr(table, constraint_key) == constraint_val)
@@ -204,7 +200,9 @@ def list_objects(
 
         # get total number of results
         total_count = session.exec(
-            select(func.count()).select_from(query.subquery())
+            select(func.count()).select_from(
+                query.with_only_columns(table.id).subquery()
+            )
         ).one()
         last_page = math.ceil(total_count / page_size) - 1
         if last_page < 0:
@@ -241,7 +239,7 @@ def get_object(table_name: str, object_id: str, include_parents: bool = True) ->
     """Return a single object form the database."""
     table = TableIndex.get_table(table_name)
     with Session(engine) as session:
-        obj = session.get(table, object_id)
+        obj = session.get(table, object_id, options=embedding_deferred_options(table))
         serialized_obj = serialize_with_type(obj, table_name)
 
         if include_parents:
@@ -250,7 +248,11 @@ def get_object(table_name: str, object_id: str, include_parents: bool = True) ->
                 if getattr(obj, parent_id_key, None):
                     parent_table = TableIndex.get_table(parent_table_name)
                     parent_id = getattr(obj, parent_id_key)
-                    _parent = session.get(parent_table, parent_id)
+                    _parent = session.get(
+                        parent_table,
+                        parent_id,
+                        options=embedding_deferred_options(parent_table),
+                    )
                     serialized_obj[parent_table_name] = serialize_with_type(
                         _parent, parent_table_name
                     )
@@ -0,0 +1,135 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+In-memory index of report titles and embeddings, used to find a report by name
+without searching the database. The report table is small and only changes
+during data ingestion, so the index is rebuilt when the data version changes.
+"""
+
+import re
+import threading
+import numpy as np
+from collections import Counter, defaultdict
+from sqlmodel import Session, select
+from kg.engine import engine
+from kg.tables import Report
+from kg.utils.version import get_data_version
+from kg.utils.embeddings import embed_query
+from kg.utils.sources import SOURCE_REGISTRY
+from kg.settings import REPORT_TITLE_MATCH_THRESHOLD
+
+
+def get_trigrams(text: str) -> set[str]:
+    """
+    Get the trigrams of a string, the same way as the pg_trgm extension:
+    each lowercase word is padded with two spaces in front and one behind.
+
+    Example:
+    get_trigrams("Cat")
+    # returns {"  c", " ca", "cat", "at "}
+    """
+    trigrams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        word = f"  {word} "
+        trigrams.update(word[i : i + 3] for i in range(len(word) - 2))
+    return trigrams
+
+
+class SourceReports:
+    """Titles and normalized embeddings of the reports from one data source."""
+
+    def __init__(self, ids: list[str], titles: list[str], embeddings: list):
+        self.ids = ids
+        self.titles = titles
+        self.embeddings = np.array(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        self.embeddings /= np.maximum(
+            np.linalg.norm(self.embeddings, axis=1, keepdims=True), 1e-12
+        )
+        self.title_trigrams = [get_trigrams(t or "") for t in titles]
+        # map of each trigram to the positions of the titles that contain it
+        self.trigram_map = defaultdict(list)
+        for i, trigrams in enumerate(self.title_trigrams):
+            for trigram in trigrams:
+                self.trigram_map[trigram].append(i)
+
+    def match_title(self, name: str) -> tuple[str | None, float]:
+        """Get the ID and trigram similarity of the report title that best matches a name."""
+        trigrams = get_trigrams(name)
+        shared = Counter(i for t in trigrams for i in self.trigram_map.get(t, []))
+        best_id, best_similarity = None, 0.0
+        for i, n_shared in shared.items():
+            n_total = len(trigrams) + len(self.title_trigrams[i]) - n_shared
+            similarity = n_shared / n_total
+            if similarity > best_similarity:
+                best_id, best_similarity = self.ids[i], similarity
+        return best_id, best_similarity
+
+    def match_embedding(self, embedding: list[float]) -> str | None:
+        """Get the ID of the report with the embedding closest to a query embedding."""
+        if not self.ids:
+            return None
+        return self.ids[int(np.argmax(self.embeddings @ np.asarray(embedding)))]
+
+
+class ReportIndex:
+    """
+    Index of report titles and embeddings, grouped by data source.
+    The index is built on first use, and rebuilt when the data version changes.
+
+    Example:
+    report_id = REPORT_INDEX.find_report("EIA", "annual energy outlook")
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._sources: dict[str, SourceReports] = {}
+
+    def refresh(self, force: bool = False) -> None:
+        """Rebuild the index if the data version has changed since it was built."""
+        version = get_data_version()
+        if version == self._version and not force:
+            return
+        with self._lock:
+            # another thread may have rebuilt the index while this one waited
+            if version == self._version and not force:
+                return
+            with Session(engine) as session:
+                reports = session.exec(
+                    select(Report.id, Report.source_id, Report.title, Report.embedding)
+                ).all()
+            grouped = defaultdict(list)
+            for row in reports:
+                grouped[row.source_id].append(row)
+            # swap in the new index all at once, so readers never see a partial index
+            self._sources = {
+                source_id: SourceReports(
+                    ids=[r.id for r in rows],
+                    titles=[r.title for r in rows],
+                    embeddings=[r.embedding for r in rows],
+                )
+                for source_id, rows in grouped.items()
+            }
+            self._version = version
+            print(f"Report index built with {len(reports)} reports.")
+
+    def find_report(self, dataset: str, name: str) -> str:
+        """
+        Get the ID of the report from a dataset that best matches a report name.
+        Report titles that are similar enough to the name (by trigram similarity)
+        are matched directly. Otherwise the name is embedded and matched to the
+        closest report embedding.
+        """
+        self.refresh()
+        source_id = SOURCE_REGISTRY.get_id(dataset)
+        source_reports = self._sources.get(source_id)
+        if source_reports is None:
+            raise ValueError(f"No reports exist for the '{dataset}' data source.")
+        report_id, similarity = source_reports.match_title(name)
+        if report_id and similarity >= REPORT_TITLE_MATCH_THRESHOLD:
+            return report_id
+        return source_reports.match_embedding(embed_query(name))
+
+
+# Report index shared by all searches in this process
+REPORT_INDEX = ReportIndex()
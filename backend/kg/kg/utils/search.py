@@ -4,16 +4,35 @@ import math
 import itertools
 import numpy as np
 from time import time
-import concurrent.futures
 from datetime import date
 from sqlmodel import Session, select, text, func, or_
 from sqlalchemy.sql import expression, distinct
 from sqlalchemy.orm import subqueryload
 from kg.table_index import TableIndex
-from kg.tables import Excerpt, Source, Report
+from kg.tables import Excerpt, Source, Report, TEXT_SEARCH_CONFIG
+from kg.tables import UEntity, Entity, EntityCooccurrence
 from kg.engine import engine
-from kg.utils.embeddings import create_embeddings
+from kg.indexes import set_vector_search_params, quantized_distance
+from kg.utils.embeddings import embed_query, embed_queries, normalize_query_text
+from kg.utils.cache import TTLCache, SemanticCache
+from kg.utils.version import get_data_version
+from kg.utils.stages import StageRunner, BATCH_EXECUTOR
+from kg.utils.ranking import reciprocal_rank_fusion, maximal_marginal_relevance
+from kg.utils.ranking import similarity_score, find_knee_index
+from kg.utils.identifiers import parse_identifiers
+from kg.utils.report_index import REPORT_INDEX
+from kg.utils.ann import EXCERPT_VECTOR_INDEX
+from kg.utils.metrics import observe_stage, observe_rag_results, log_rag_results
+from kg.settings import RAG_CACHE_SIZE, RAG_CACHE_TTL_SECONDS, MMR_POOL_FACTOR
+from kg.settings import (
+    RAG_SEMANTIC_CACHE_SIZE,
+    RAG_SEMANTIC_CACHE_TTL_SECONDS,
+    RAG_SEMANTIC_CACHE_THRESHOLD,
+)
+from kg.settings import USE_ANN_ACCELERATOR, VECTOR_QUANTIZATION, QUANTIZED_RERANK_FACTOR
+from kg.settings import GRAPH_EXPANSION_NEIGHBORS, GRAPH_EXPANSION_EXCLUDED_ENTITY_TYPES
 from kg.utils.serialize import process_relationships, serialize_with_type
+from kg.utils.query import select_table, deferred_load_options
 from kg.utils.clean import remove_duplicate_dict_values
 from kg.utils.read import (
     get_all_data_source_ids,
@@ -22,27 +41,66 @@ from kg.utils.read import (
 )
 from kg.utils.osti_search import create_osti_payload, search_osti, SearchOSTIPayload
 
-from sqlalchemy import union_all, true
+from sqlalchemy import union_all, true, exists
 from contextlib import contextmanager
+from typing import Iterable, Iterator
 import logging
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s.%(msecs)03d [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+
+# Ways of retrieving excerpts for RAG:
+# - "semantic": vector search only
+# - "hybrid": vector search and lexical (full text) search, merged by reciprocal rank fusion
+SEARCH_MODES = ["semantic", "hybrid"]
+
+# Ways of adding synthetic diversity to semantic search results:
+# - "source": query the top matches from each data source separately
+# - "mmr": re-rank one pool of top matches by maximal marginal relevance
+DIVERSITY_MODES = ["source", "mmr"]
+
+# Shapes of RAG responses:
+# - "nested": each excerpt embeds its report and source, and each report embeds
+#   its source and excerpts
+# - "normalized": sources, reports and excerpts are listed once each, keyed by ID,
+#   and refer to each other by ID
+RESPONSE_FORMATS = ["nested", "normalized"]
+
+# Ways of trimming weak semantic search matches:
+# - "none": return max_count matches
+# - "knee": leave out matches that score below the knee point of the similarity scores
+SCORE_CUTOFFS = ["none", "knee"]
+
+# Fewest semantic search matches that are kept by a knee cutoff
+KNEE_MIN_COUNT = 3
+
+# Cache of full RAG results, keyed on the search parameters and the data version
+RAG_RESULT_CACHE = TTLCache(
+    "rag_result",
+    maxsize=RAG_CACHE_SIZE,
+    ttl_seconds=RAG_CACHE_TTL_SECONDS,
+)
+
+# Cache of full RAG results, looked up by query embedding, so rephrasings of a
+# query with the same search parameters and data version reuse its results
+RAG_SEMANTIC_CACHE = SemanticCache(
+    "rag_semantic",
+    maxsize=RAG_SEMANTIC_CACHE_SIZE,
+    ttl_seconds=RAG_SEMANTIC_CACHE_TTL_SECONDS,
+    threshold=RAG_SEMANTIC_CACHE_THRESHOLD,
+)
 
 
 @contextmanager
-def log_time(label: str):
+def log_time(label: str, stage: str | None = None):
+    """Log the time spent in a block, and record it in the metrics of a search stage."""
     start = time()
     try:
         yield
     finally:
         elapsed = time() - start
         logging.debug(f"{elapsed:.2f} SECONDS: {label}")
+        if stage:
+            observe_stage(stage, elapsed)
 
 
 def convert_to_osti_search(parameters: dict) -> SearchOSTIPayload:
@@ -59,6 +117,7 @@ def convert_to_osti_search(parameters: dict) -> SearchOSTIPayload:
         include:
             - 'q' (str): The search query term.
             - 'earliest_year' (Union[str, None]): The start year for the search range.
+            - 'latest_year' (Union[str, None]): The end year for the search range.
             - 'report' (Union[str, None]): The title of the report to search for.
             - 'maxcount' (int): Maximum number of results.
 
@@ -71,6 +130,8 @@ def convert_to_osti_search(parameters: dict) -> SearchOSTIPayload:
         search_params["q"] = parameters['q']
     if parameters['earliest_year']:
         search_params['publication_date_start'] = f"01/01/{parameters['earliest_year']}"
+    if parameters.get('latest_year'):
+        search_params['publication_date_end'] = f"12/31/{parameters['latest_year']}"
     if parameters['report']:
         search_params["title"] = parameters['report']
     payload_parameters['query_params'] = search_params
@@ -81,12 +142,97 @@ def convert_to_osti_search(parameters: dict) -> SearchOSTIPayload:
     return create_osti_payload(payload_parameters)
 
 
+def order_by_vector_distance(
+        base_query,
+        table,
+        query_embedding: list[float],
+        limit: int,
+        max_distance: float | None = None,
+):
+    """
+    Order a query over a table with embeddings by cosine distance to a query embedding,
+    and limit it to the top matches. The cosine distance of each match is added to the
+    selected columns as "distance", so the query must be run with session.execute,
+    since session.exec would only return the first column of each row.
+    If max_distance is given, matches that are further from the query are left out
+    in the database, so weak matches are never loaded.
+
+    If VECTOR_QUANTIZATION is set, a coarse pass first finds the top
+    limit * QUANTIZED_RERANK_FACTOR candidates using the smaller index on the
+    quantized embeddings, and only those candidates are re-ranked by their exact
+    (full precision) cosine distance.
+    """
+    if VECTOR_QUANTIZATION == "none":
+        distance = table.embedding.cosine_distance(query_embedding)
+        query = base_query.add_columns(distance.label("distance"))
+        if max_distance is not None:
+            query = query.where(distance <= max_distance)
+        return query.order_by(distance).limit(limit)
+    candidates = (
+        base_query.with_only_columns(
+            table.id,
+            table.embedding.cosine_distance(query_embedding).label("distance"),
+        )
+        .order_by(quantized_distance(table, query_embedding))
+        .limit(limit * QUANTIZED_RERANK_FACTOR)
+        .subquery("candidates")
+    )
+    query = base_query.add_columns(candidates.c.distance).join(
+        candidates, candidates.c.id == table.id
+    )
+    if max_distance is not None:
+        query = query.where(candidates.c.distance <= max_distance)
+    return query.order_by(candidates.c.distance).limit(limit)
+
+
+def add_similarity_scores(results: list[dict], distances: dict[str, float]) -> list[dict]:
+    """
+    Add the "cosineDistance" and "similarityScore" of each search result,
+    given the cosine distances of the results by ID.
+    """
+    for result in results:
+        distance = distances.get(result["id"])
+        if distance is not None:
+            result["cosineDistance"] = float(distance)
+            result["similarityScore"] = similarity_score(distance)
+    return results
+
+
+def get_max_distance(min_similarity: float) -> float | None:
+    """
+    Convert a minimum similarity score into the maximum cosine distance
+    of search results, or None if results aren't filtered by similarity.
+    """
+    if not min_similarity or min_similarity <= 0:
+        return None
+    return 2.0 * (1.0 - float(min_similarity))
+
+
+def select_by_ranked_ids(session, base_query, table, ids: list[str]) -> list:
+    """
+    Load the rows with the given IDs from a base query, in the order of the IDs.
+    Used to load the results of searches that were ranked outside of the database.
+    """
+    if not ids:
+        return []
+    results = session.exec(base_query.where(table.id.in_(ids))).all()
+    rank = {_id: i for i, _id in enumerate(ids)}
+    return sorted(results, key=lambda r: rank[r.id])
+
+
 def semantic_search_router(
         q: str,
         dataset: str = "",
         diversity: float = 0.0,
         earliest_year: int | str = None,
+        latest_year: int | str = None,
         max_count: int = 15,
+        recall: float = 0.5,
+        diversity_mode: str = "source",
+        query_embedding: list[float] | None = None,
+        datasource_id: str | None = None,
+        all_source_ids: list[str] | None = None,
+        min_similarity: float = 0.0,
 ) -> list[dict]:
     """
     Perform a semantic search across a database table using vector similarity,
@@ -110,13 +256,21 @@ def semantic_search_router(
         dataset (str, optional): The name of the dataset to limit the search to (e.g. OSTI). Defaults to an empty string. Use the dataset abbreviation here.
         diversity (float): Measure of how diverse the retireved data should be.
         earliest_year (int, str, optional): Only return records that have a published_at year >= earliest_year. If None, perform no filtering by date. Defaults to None.
+        latest_year (int, str, optional): Only return records that have a published_at year <= latest_year. If None, perform no filtering by date. Defaults to None.
         max_count (int, optional): The maximum number of search results to return. Defaults to 15.
+        recall (float, optional): Vector index search accuracy, from 0.0 (fastest) to 1.0 (most accurate). Defaults to 0.5.
+        diversity_mode (str, optional): How to add diversity, one of DIVERSITY_MODES. "mmr" re-ranks a pool of top matches so they aren't redundant, with diversity as 1 - the MMR lambda. Defaults to "source".
+        query_embedding (list[float], optional): Precomputed embedding of the query. If None, the query is embedded here.
+        datasource_id (str, optional): Precomputed ID of the dataset. If None, it's looked up from the dataset name.
+        all_source_ids (list[str], optional): Precomputed IDs of all data sources, used for diverse searches. If None, they're looked up here.
+        min_similarity (float, optional): Only return results with a similarityScore of at least this value, filtered in the database query. Defaults to 0.0 (no filtering).
 
     Returns:
         list[dict]: A list of dictionaries containing the search results, each with the following keys:
             - cosineDistance (float): The cosine distance between the query and the result.
             - similarityScore (float): The similarity score, calculated as 1 - (cosineDistance / 2).
             - Other keys corresponding to the columns in the table.
+        Results from diverse searches are not sorted by similarity score.
 
     Examples:
         >>> results = semantic_search_router("example query")
@@ -132,59 +286,163 @@ def semantic_search_router(
     TABLE_NAME = "excerpt"
     table = TableIndex.get_table(TABLE_NAME)
 
-    with log_time("Getting query embedding"):
-        # create embedding of the search query
-        query_embedding = create_embeddings([q])[0]
+    if query_embedding is None:
+        with log_time("Getting query embedding"):
+            # create embedding of the search query
+            query_embedding = embed_query(q)
+
+    # weak matches are filtered out in the search queries
+    max_distance = get_max_distance(min_similarity)
 
     with Session(engine) as session:
 
+        # MMR diversity searches for a larger pool of candidates to re-rank
+        use_mmr = diversity >= 0.1 and diversity_mode == "mmr"
+        search_count = max_count * MMR_POOL_FACTOR if use_mmr else max_count
+
+        # Tune the vector index scans for this search, which scan further
+        # for candidates when the coarse quantized index is used
+        if VECTOR_QUANTIZATION != "none":
+            scan_count = search_count * QUANTIZED_RERANK_FACTOR
+        else:
+            scan_count = search_count
+        set_vector_search_params(session, max_count=scan_count, recall=recall)
+
         # Create base query for vector search over specific columns
-        base_query = select(table)
+        base_query = select_table(table, include={"json_content"})
 
         # Handle filtering by date
         base_query = append_date_filter_to_query(
             base_query,
             table_name=TABLE_NAME,
             earliest_year=earliest_year,
+            latest_year=latest_year,
         )
 
         # Handle filtering by specific dataset. This overrides diversity.
+        filter_source_ids = None
         if dataset:
             try:
-                datasource_id = get_data_source_id(dataset)
+                datasource_id = datasource_id or get_data_source_id(dataset)
                 base_query = base_query.where(table.source_id == datasource_id)
+                filter_source_ids = [datasource_id]
             except (AttributeError, ValueError):
                 print(f"Error trying to filter by dataset '{dataset}'")
                 pass
 
-        if diversity < 0.1:
+        # In-process vectors, if enabled and exported for the current data version
+        vectors = EXCERPT_VECTOR_INDEX.get() if USE_ANN_ACCELERATOR else None
+
+        if diversity < 0.1 and vectors is not None:
+            # No synthetic diversity, searched in process:
+            # Find the top matches in the memory-mapped vectors, then load them.
+            with log_time("In-process vector search", stage="ann_accelerator"):
+                positions = vectors.top_k(
+                    query_embedding,
+                    k=max_count,
+                    source_ids=filter_source_ids,
+                    earliest_year=earliest_year,
+                    latest_year=latest_year,
+                    max_distance=max_distance,
+                )
+                top_ids = vectors.ids[positions].tolist()
+                distances = dict(
+                    zip(top_ids, vectors.cosine_distances(query_embedding, positions))
+                )
+            with log_time("In-process vector search results query"):
+                results = select_by_ranked_ids(session, base_query, table, top_ids)
+                results = process_relationships(results, TABLE_NAME)
+                results = add_similarity_scores(results, distances)
+
+        elif diversity < 0.1:
             # No synthetic diversity (default behavior):
             # Return top matches regardless of which data sources they come from.
             with log_time("Full diversity < 0.1 semantic search query"):
-                base_query = base_query.order_by(
-                    table.embedding.cosine_distance(query_embedding)
-                ).limit(max_count)
-                results = session.exec(base_query).all()
+                base_query = order_by_vector_distance(
+                    base_query, table, query_embedding, max_count, max_distance
+                )
+                rows = session.execute(base_query).all()
+                results = process_relationships([r[0] for r in rows], TABLE_NAME)
+                results = add_similarity_scores(
+                    results, {r[0].id: r.distance for r in rows}
+                )
+
+        elif use_mmr:
+            # Maximal marginal relevance diversity:
+            # Get a pool of top matches with one query, then select the matches
+            # that are relevant to the query but not redundant with each other.
+            with log_time("MMR candidate pool query", stage="mmr_candidates"):
+                if vectors is not None:
+                    positions = vectors.top_k(
+                        query_embedding,
+                        k=search_count,
+                        source_ids=filter_source_ids,
+                        earliest_year=earliest_year,
+                        latest_year=latest_year,
+                        max_distance=max_distance,
+                    )
+                    candidate_ids = vectors.ids[positions].tolist()
+                    candidate_embeddings = vectors.embeddings[positions]
+                    candidate_distances = vectors.cosine_distances(
+                        query_embedding, positions
+                    )
+                else:
+                    # execute returns rows of all the selected columns, where exec
+                    # would return only the first column of this SelectOfScalar
+                    candidates = session.execute(
+                        order_by_vector_distance(
+                            base_query.with_only_columns(table.id, table.embedding),
+                            table,
+                            query_embedding,
+                            search_count,
+                            max_distance,
+                        )
+                    ).all()
+                    candidate_ids = [c.id for c in candidates]
+                    candidate_embeddings = [c.embedding for c in candidates]
+                    candidate_distances = [c.distance for c in candidates]
+            with log_time("MMR re-ranking", stage="mmr_reranking"):
+                selected = maximal_marginal_relevance(
+                    query_embedding,
+                    candidate_embeddings,
+                    lambda_mult=1.0 - diversity,
+                    max_count=max_count,
+                )
+                selected_ids = [candidate_ids[i] for i in selected]
+            with log_time("MMR results query"):
+                results = select_by_ranked_ids(session, base_query, table, selected_ids)
                 results = process_relationships(results, TABLE_NAME)
+                results = add_similarity_scores(
+                    results, dict(zip(candidate_ids, candidate_distances))
+                )
 
         elif diversity < 0.9:
             # Some synthetic diversity:
             # Return top matches, and augment them with a couple extra matches from each source.
             with log_time("Full diversity < 0.9 base query"):
-                base_query = base_query.order_by(
-                    table.embedding.cosine_distance(query_embedding)
-                ).limit(math.floor(max_count / 2))
-                base_results = session.exec(base_query).all()
-                base_results = process_relationships(base_results, TABLE_NAME)
+                base_query = order_by_vector_distance(
+                    base_query,
+                    table,
+                    query_embedding,
+                    math.floor(max_count / 2),
+                    max_distance,
+                )
+                rows = session.execute(base_query).all()
+                base_results = process_relationships([r[0] for r in rows], TABLE_NAME)
+                base_results = add_similarity_scores(
+                    base_results, {r[0].id: r.distance for r in rows}
+                )
 
             with log_time("Full diversity < 0.9 diversity query"):
-                all_source_ids = get_all_data_source_ids(session)
+                all_source_ids = all_source_ids or get_all_data_source_ids()
                 diversity_results = top_n_excerpts_per_group_query(
                     session=session,
                     source_ids=all_source_ids,
                     query_embedding=query_embedding,
                     earliest_year=earliest_year,
+                    latest_year=latest_year,
                     n_per_group=max(2, math.ceil(max_count / 2 / len(all_source_ids))),
+                    max_distance=max_distance,
                 )
             results = base_results + diversity_results
 
@@ -192,13 +450,15 @@ def semantic_search_router(
             # High synthetic diversity:
             # Return an equal number of top matches from each data source.
             with log_time("Full diversity >= 0.9 semantic search query"):
-                all_source_ids = get_all_data_source_ids(session)
+                all_source_ids = all_source_ids or get_all_data_source_ids()
                 results = top_n_excerpts_per_group_query(
                     session=session,
                     source_ids=all_source_ids,
                     query_embedding=query_embedding,
                     earliest_year=earliest_year,
+                    latest_year=latest_year,
                     n_per_group=max(2, math.ceil(max_count / len(all_source_ids))),
+                    max_distance=max_distance,
                 )
 
         unique_results = remove_duplicate_dict_values(results, "id")
@@ -260,80 +520,113 @@ def top_n_excerpts_per_group_query(
         source_ids: list[str],
         query_embedding: list[float],
         earliest_year: int | str = None,
+        latest_year: int | str = None,
         n_per_group: int = 3,
+        max_distance: float | None = None,
 ) -> list[dict]:
     """
     Perform a top-n-per-group query to retrieve the top N matching items from each data source group.
     This method enforces high diversity in retrieved results by querying each source_id separately.
 
-    Running the queries sequentially in a loop is roughly 2x faster than using a single
-    partitioned window query.
+    All sources are searched in a single round trip using a LATERAL join over the
+    Source table, so each source still gets its own ORDER BY ... LIMIT subquery
+    that can use the vector index, without one blocking query per source.
+    Sources that have no reports which can satisfy the date filter are skipped.
 
     Args:
         session: SQLAlchemy session object.
         source_ids: List of source IDs to query against. This allows for high diversity in the results.
         query_embedding: List of floats representing the query vector for similarity search.
         earliest_year: Optional year to filter excerpts from this year onward.
+        latest_year: Optional year to filter excerpts up to the end of this year.
         n_per_group: Number of top items to retrieve per source_id (default: 3).
+        max_distance: Optional maximum cosine distance of the retrieved items.
 
     Returns:
-        List of dictionaries containing excerpt data, sorted by cosine distance.
+        List of dictionaries containing excerpt data, sorted by cosine distance,
+        with their "cosineDistance" and "similarityScore".
     """
 
-    results = []
-    for source_id in source_ids:
-
-        query = select(
-            Excerpt,
-            Excerpt.embedding.cosine_distance(query_embedding).label("distance"),
-        ).where(Excerpt.source_id == source_id)
-
-        if earliest_year:
-            query = append_date_filter_to_query(
-                query=query,
-                table_name="excerpt",
-                earliest_year=earliest_year,
+    # Only search sources that could return at least one row for the date filter
+    source_query = select(Source.id).where(Source.id.in_(source_ids))
+    if earliest_year or latest_year:
+        source_query = source_query.where(
+            exists(
+                append_date_filter_to_query(
+                    select(Report.id).where(Report.source_id == Source.id),
+                    table_name="report",
+                    earliest_year=earliest_year,
+                    latest_year=latest_year,
+                )
             )
+        )
+    sources = source_query.subquery("sources")
+
+    # Top-n excerpts for a single source, correlated to the outer source row
+    distance = Excerpt.embedding.cosine_distance(query_embedding)
+    per_source_query = select(
+        Excerpt.id.label("id"),
+        distance.label("distance"),
+    ).where(Excerpt.source_id == sources.c.id)
+    if max_distance is not None:
+        per_source_query = per_source_query.where(distance <= max_distance)
+    if earliest_year or latest_year:
+        per_source_query = append_date_filter_to_query(
+            query=per_source_query,
+            table_name="excerpt",
+            earliest_year=earliest_year,
+            latest_year=latest_year,
+        )
+    per_source = (
+        per_source_query.correlate(sources)
+        .order_by("distance")
+        .limit(n_per_group)
+        .lateral("per_source")
+    )
 
-        query = query.order_by("distance").limit(n_per_group)
-        batch_results = session.execute(query).all()
-        results.extend([(result.Excerpt, result.distance) for result in batch_results])
+    query = (
+        select(Excerpt, per_source.c.distance)
+        .options(*deferred_load_options(Excerpt, include={"json_content"}))
+        .select_from(sources)
+        .join(per_source, true())
+        .join(Excerpt, Excerpt.id == per_source.c.id)
+        .order_by(per_source.c.distance)
+    )
+    results = session.execute(query).all()
 
     # Serialize results
-    results.sort(key=lambda x: x[1])
     raw_excerpts = [r[0] for r in results]
     final_results = process_relationships(raw_excerpts, "excerpt")
-    return final_results
+    return add_similarity_scores(final_results, {r[0].id: r[1] for r in results})
 
 
 def append_date_filter_to_query(
         query: select,
         table_name: str = "excerpt",
         earliest_year: int | str = None,
+        latest_year: int | str = None,
 ) -> select:
     """
-    Append date filtering to the query based on the provided earliest_year.
+    Append date filtering to the query based on the provided earliest_year and latest_year.
     This function is intended to be used within the semantic search function.
+
+    Excerpts and entities store a copy of their report's published_at date,
+    so they are filtered directly on their own indexed column without a join.
     """
-    report_table = TableIndex.get_table("report")
+    if not earliest_year and not latest_year:
+        return query
+    if table_name not in ("report", "excerpt", "entity"):
+        print(f"Date filtering is not implemented on the '{table_name}' table.")
+        return query
+
+    published_at = TableIndex.get_table(table_name).published_at
+    query = query.where(published_at.is_not(None))
     # If earliest_year is provided, restrict by published_at >= earliest_date
     if earliest_year:
-        earliest_date = date(int(earliest_year), 1, 1)
-        if table_name == "report":
-            # Filter directly on the report table's published_at
-            query = query.where(
-                report_table.published_at.is_not(None),
-                report_table.published_at >= earliest_date,
-            )
-        elif table_name in ("excerpt", "entity"):
-            # Join to the 'report' table and filter on its published_at
-            table = TableIndex.get_table(table_name)
-            query = query.join(report_table, table.report_id == report_table.id).where(
-                report_table.published_at.is_not(None),
-                report_table.published_at >= earliest_date,
-            )
-        else:
-            print(f"Date filtering is not implemented on the '{TABLE_NAME}' table.")
+        query = query.where(published_at >= date(int(earliest_year), 1, 1))
+    # If latest_year is provided, restrict by published_at <= the end of that year
+    if latest_year:
+        query = query.where(published_at < date(int(latest_year) + 1, 1, 1))
     return query
 
 
@@ -342,62 +635,459 @@ def rag_retrieval(
         dataset: str = "",
         report: str = "",
         earliest_year: int | str = None,
+        latest_year: int | str = None,
         max_count: int = 15,
         diversity: float = 0.0,
         max_excerpts_per_report: int = 30,
+        recall: float = 0.5,
+        search_mode: str = "semantic",
+        diversity_mode: str = "source",
+        use_cache: bool = True,
+        query_embedding: list[float] | None = None,
+        min_similarity: float = 0.0,
+        score_cutoff: str = "none",
+        graph_expansion: int = 0,
 ) -> dict:
     """
     Perform retrieval for Retrieval-Augmented Generation (RAG) using semantic search.
     This function searches across all data excerpts and unique entities to find the top matches
-    to the given query. It runs the semantic search database queries in parallel using a thread pool.
+    to the given query. Stages that don't depend on each other, like embedding the query,
+    looking up data source IDs and string search over reports, run concurrently on a shared
+    thread pool. Each stage is given RAG_STAGE_TIMEOUT_SECONDS to finish, and optional stages
+    that fail or time out are left out of the results instead of failing the search.
+
+    Results are cached in-process and tagged with the knowledge graph data version,
+    so a cached result is reused until the next data ingestion commits. Semantic searches
+    also reuse the cached results of near-duplicate queries with the same parameters,
+    whose query embeddings have a cosine similarity of at least RAG_SEMANTIC_CACHE_THRESHOLD.
 
     Args:
         query (str): The search query string.
         dataset (str, optional): The name of the dataset to limit the search to (e.g. OSTI). Defaults to an empty string. Use the dataset abbreviation here.
         earliest_year (int, str, optional): Only return records that have a published_at year >= earliest_year. If None, perform no filtering by date. Defaults to None.
+        latest_year (int, str, optional): Only return records that have a published_at year <= latest_year. If None, perform no filtering by date. Defaults to None.
         diversity (float): Measure of how diverse the retireved data should be.
         max_count (int, optional): The maximum number of results to return per table. Defaults to 15.
+        recall (float, optional): Vector index search accuracy, from 0.0 (fastest) to 1.0 (most accurate). Defaults to 0.5.
+        search_mode (str, optional): How to retrieve excerpts, one of SEARCH_MODES. "hybrid" adds lexical search for exact tokens. Defaults to "semantic".
+        diversity_mode (str, optional): How to add diversity, one of DIVERSITY_MODES. Defaults to "source".
+        use_cache (bool, optional): Whether to use the RAG result cache. Defaults to True.
+        query_embedding (list[float], optional): Precomputed embedding of the query. If None, the query is embedded during the search.
+        min_similarity (float, optional): Only return semantic search matches with a similarity score of at least this value, filtered in the database query. Defaults to 0.0 (no filtering).
+        score_cutoff (str, optional): How to trim weak semantic search matches, one of SCORE_CUTOFFS. "knee" leaves out matches that score below the knee point, so sharply focused questions return fewer excerpts. Defaults to "none".
+        graph_expansion (int, optional): Maximum number of excerpts to add that are linked to the semantic search matches through their most frequently co-occurring entities. Defaults to 0 (no graph expansion).
 
     Returns:
         dict: A dictionary containing the search results, including:
             - "query": The search query string.
             - "diversity": Value of the diversity input parameter.
             - "excerpts": A list of matching excerpts.
-            - "similarityScores": A list of similarity scores for the matching excerpts.
-            - "indexThreshold": The knee point index of the similarity scores.
+            - "similarityScores": The similarity scores of the semantic search matches, from highest to lowest, before any cutoff.
+            - "indexThreshold": The index of the knee point in the similarity scores, or None if they have no knee.
             - "ragElapsedSeconds": Elapsed time in seconds for the full RAG data retrieval search.
+            - "stageElapsedSeconds": Elapsed time in seconds for each stage of the search.
+            - "failedStages": Names of the stages that failed or timed out.
 
     """
+    return collect_rag_events(
+        stream_rag_retrieval(
+            query,
+            dataset=dataset,
+            report=report,
+            earliest_year=earliest_year,
+            latest_year=latest_year,
+            max_count=max_count,
+            diversity=diversity,
+            max_excerpts_per_report=max_excerpts_per_report,
+            recall=recall,
+            search_mode=search_mode,
+            diversity_mode=diversity_mode,
+            use_cache=use_cache,
+            query_embedding=query_embedding,
+            min_similarity=min_similarity,
+            score_cutoff=score_cutoff,
+            graph_expansion=graph_expansion,
+        )
+    )
 
+
+def stream_rag_retrieval(
+        query: str,
+        dataset: str = "",
+        report: str = "",
+        earliest_year: int | str = None,
+        latest_year: int | str = None,
+        max_count: int = 15,
+        diversity: float = 0.0,
+        max_excerpts_per_report: int = 30,
+        recall: float = 0.5,
+        search_mode: str = "semantic",
+        diversity_mode: str = "source",
+        use_cache: bool = True,
+        query_embedding: list[float] | None = None,
+        min_similarity: float = 0.0,
+        score_cutoff: str = "none",
+        graph_expansion: int = 0,
+) -> Iterator[dict]:
+    """
+    Perform retrieval for RAG like `rag_retrieval`, but yield the results as events
+    while the stages of the search finish, so clients can start using the first
+    matches before the slower stages are done. Each event is a dictionary with an
+    "event" key, and a "stage" key with the name of the stage that produced it:
+        - {"event": "excerpts", "stage": ..., "excerpts": [...]}: new matching excerpts.
+        - {"event": "reports", "stage": ..., "reports": [...]}: new matching reports.
+        - {"event": "done", ...}: the remaining keys of the `rag_retrieval` results.
+    Excerpts and reports are never repeated across events. Joining the excerpts and
+    reports of all events in order gives the same results as `rag_retrieval`.
+    """
     start_time = time()
 
-    print("Backend RAG search endpoint received:")
-    print(
-        f"QUERY: {query}\nDATASET: {dataset}\nREPORT: {report}\nEARLIEST_YEAR: {earliest_year}\nDIVERSITY: {diversity}\nMAX_COUNT: {max_count}"
+    cache_key = (
+        get_data_version(),
+        normalize_query_text(query),
+        dataset,
+        report,
+        str(earliest_year) if earliest_year else None,
+        str(latest_year) if latest_year else None,
+        float(diversity),
+        max_count,
+        max_excerpts_per_report,
+        float(recall),
+        search_mode,
+        diversity_mode,
+        float(min_similarity or 0.0),
+        score_cutoff,
+        int(graph_expansion or 0),
+    )
+    if use_cache:
+        cached_results = RAG_RESULT_CACHE.get(cache_key)
+        if cached_results is not None:
+            logging.debug(f"RAG result cache hit for query: {query}")
+            observe_rag_results(cached_results, time() - start_time, cached=True)
+            yield from rag_results_to_events(
+                {
+                    **cached_results,
+                    "ragElapsedSeconds": round(time() - start_time, 2),
+                    "stageElapsedSeconds": {},
+                },
+                stage="cache",
+            )
+            return
+
+    # Rephrasings of a cached query reuse its results. Searches that don't use a query
+    # embedding, or whose results depend on the exact words of the query, skip this.
+    semantic_cache_key = (cache_key[0], *cache_key[2:])
+    use_semantic_cache = (
+        use_cache
+        and RAG_SEMANTIC_CACHE.maxsize > 0
+        and search_mode == "semantic"
+        and not (report and dataset)
+        and not parse_identifiers(query)
     )
+    if use_semantic_cache and query_embedding is None:
+        try:
+            with log_time("Getting query embedding", stage="query_embedding"):
+                query_embedding = embed_query(query)
+        except Exception as e:
+            print(f"Error trying to embed query for the semantic cache: {e}")
+            use_semantic_cache = False
+    if use_semantic_cache:
+        cached = RAG_SEMANTIC_CACHE.get(query_embedding, semantic_cache_key)
+        if cached is not None:
+            cached_results, similarity = cached
+            logging.debug(f"RAG semantic cache hit for query: {query}")
+            observe_rag_results(cached_results, time() - start_time, cached=True)
+            yield from rag_results_to_events(
+                {
+                    **cached_results,
+                    "query": query,
+                    "cachedQuery": cached_results["query"],
+                    "cachedQuerySimilarity": round(similarity, 4),
+                    "ragElapsedSeconds": round(time() - start_time, 2),
+                    "stageElapsedSeconds": {},
+                },
+                stage="semantic_cache",
+            )
+            return
+
+    events = []
+    for event in _rag_retrieval_events(
+        query,
+        dataset=dataset,
+        report=report,
+        earliest_year=earliest_year,
+        latest_year=latest_year,
+        max_count=max_count,
+        diversity=diversity,
+        max_excerpts_per_report=max_excerpts_per_report,
+        recall=recall,
+        search_mode=search_mode,
+        diversity_mode=diversity_mode,
+        query_embedding=query_embedding,
+        min_similarity=min_similarity,
+        score_cutoff=score_cutoff,
+        graph_expansion=graph_expansion,
+    ):
+        events.append(event)
+        yield event
+
+    results = collect_rag_events(events)
+    observe_rag_results(results, time() - start_time, cached=False)
+    log_rag_results(results)
+    # Don't cache incomplete results from stages that failed or timed out
+    if use_cache and not results["failedStages"]:
+        RAG_RESULT_CACHE.set(cache_key, results)
+        if use_semantic_cache:
+            RAG_SEMANTIC_CACHE.set(query_embedding, semantic_cache_key, results)
+
+
+def rag_results_to_events(results: dict, stage: str = "results") -> Iterator[dict]:
+    """Convert complete RAG results into the events of `stream_rag_retrieval`."""
+    yield {"event": "excerpts", "stage": stage, "excerpts": results["excerpts"]}
+    yield {"event": "reports", "stage": stage, "reports": results["reports"]}
+    yield {
+        "event": "done",
+        **{k: v for k, v in results.items() if k not in {"excerpts", "reports"}},
+    }
+
+
+def end_rag_events_on_error(events: Iterable[dict]) -> Iterator[dict]:
+    """
+    Pass on the events of `stream_rag_retrieval`, but if the search fails, end
+    with an {"event": "error", "error": ...} event instead of raising. Once the
+    first events are sent, a raised error would only cut the stream short, so
+    this lets clients tell a failed search from a truncated stream.
+    """
+    start_time = time()
+    try:
+        yield from events
+    except Exception as e:
+        print(f"Error in streamed RAG search: {e}")
+        yield {
+            "event": "error",
+            "error": str(e),
+            "ragElapsedSeconds": round(time() - start_time, 2),
+        }
+
+
+def collect_rag_events(events: Iterable[dict]) -> dict:
+    """Join the events of `stream_rag_retrieval` into complete RAG results."""
+    excerpts, reports, done = [], [], {}
+    for event in events:
+        if event["event"] == "excerpts":
+            excerpts.extend(event["excerpts"])
+        elif event["event"] == "reports":
+            reports.extend(event["reports"])
+        elif event["event"] == "done":
+            done = {k: v for k, v in event.items() if k != "event"}
+    return {
+        "query": done.get("query"),
+        "diversity": done.get("diversity"),
+        "excerpts": excerpts,
+        "reports": reports,
+        **done,
+    }
+
+
+def normalize_rag_results(results: dict) -> dict:
+    """
+    Convert RAG results into the "normalized" response format, where each source,
+    report and excerpt is serialized once, even if several results refer to it.
+    The "sources", "reports" and "excerpts" keys are maps of objects by ID, with
+    the nested "source", "report" and "excerpts" of each object replaced by the
+    "source_id" and "report_id" columns and an "excerptIds" list. The order of the
+    results is kept in "reportIds" and "excerptIds". All other keys are unchanged.
+    The input results are not modified, so cached results can be normalized.
+
+    Example:
+    normalize_rag_results({"excerpts": [{"id": "e1", "report": {"id": "r1"}}], ...})
+    # returns {"excerpts": {"e1": {"id": "e1"}}, "reports": {"r1": {"id": "r1", ...}},
+    #          "excerptIds": ["e1"], "reportIds": [], "sources": {}, ...}
+    """
+    sources, reports, excerpts = {}, {}, {}
+
+    def add_source(source: dict | None) -> None:
+        if source and source.get("id"):
+            sources.setdefault(source["id"], source)
+
+    def add_report(report: dict | None) -> None:
+        if not report or not report.get("id"):
+            return
+        add_source(report.get("source"))
+        child_excerpts = report.get("excerpts") or []
+        for excerpt in child_excerpts:
+            add_excerpt(excerpt)
+        normalized = {
+            k: v for k, v in report.items() if k not in {"source", "excerpts"}
+        }
+        if "excerpts" in report:
+            normalized["excerptIds"] = [e["id"] for e in child_excerpts]
+        existing = reports.get(report["id"])
+        # keep the most complete copy of each report, like the ranked report
+        # with its "match" key, while keeping its child excerpt IDs
+        if existing is None:
+            reports[report["id"]] = normalized
+        else:
+            for key, value in normalized.items():
+                existing.setdefault(key, value)
+
+    def add_excerpt(excerpt: dict) -> None:
+        add_source(excerpt.get("source"))
+        add_report(excerpt.get("report"))
+        normalized = {
+            k: v for k, v in excerpt.items() if k not in {"source", "report"}
+        }
+        existing = excerpts.get(excerpt["id"])
+        if existing is None:
+            excerpts[excerpt["id"]] = normalized
+        else:
+            for key, value in normalized.items():
+                existing.setdefault(key, value)
+
+    report_ids = []
+    for report in results.get("reports", []):
+        add_report(report)
+        report_ids.append(report["id"])
+    excerpt_ids = []
+    for excerpt in results.get("excerpts", []):
+        add_excerpt(excerpt)
+        excerpt_ids.append(excerpt["id"])
+
+    return {
+        **{k: v for k, v in results.items() if k not in {"excerpts", "reports"}},
+        "responseFormat": "normalized",
+        "excerptIds": excerpt_ids,
+        "reportIds": report_ids,
+        "sources": sources,
+        "reports": reports,
+        "excerpts": excerpts,
+    }
+
+
+def batch_rag_retrieval(searches: list[dict]) -> list[dict]:
+    """
+    Perform retrieval for RAG for several searches at once. Each search is a
+    dictionary of `rag_retrieval` keyword arguments, including "query".
+    The queries of all searches that need a vector search are embedded together,
+    in a single ML API call, and the searches run concurrently on separate
+    pooled connections.
+
+    Returns the results of each search, in the same order as the searches.
+    A search that fails returns {"query": ..., "error": ...} instead of
+    failing the whole batch.
+
+    Example:
+    batch_rag_retrieval([{"query": "grid outages"}, {"query": "CVE-2024-1234"}])
+    # returns [{"query": "grid outages", "excerpts": [...], ...}, {...}]
+    """
+    # Report lookups, OSTI searches and identifier queries don't use query embeddings
+    embedded = [
+        i
+        for i, search in enumerate(searches)
+        if search.get("dataset", "").lower() != "osti"
+        and not (search.get("report") and search.get("dataset"))
+        and not parse_identifiers(search["query"])
+    ]
+    query_embeddings = {}
+    if embedded:
+        try:
+            with log_time("Batch query embeddings", stage="query_embedding"):
+                embeddings = embed_queries([searches[i]["query"] for i in embedded])
+            query_embeddings = dict(zip(embedded, embeddings))
+        except Exception as e:
+            # each search embeds its own query instead
+            print(f"Error embedding batch queries: {e}")
+
+    futures = [
+        BATCH_EXECUTOR.submit(_batch_search, search, query_embeddings.get(i))
+        for i, search in enumerate(searches)
+    ]
+    return [future.result() for future in futures]
+
+
+def _batch_search(search: dict, query_embedding: list[float] | None = None) -> dict:
+    """Run a single search of `batch_rag_retrieval`."""
+    try:
+        if search.get("dataset", "").lower() == "osti":
+            return search_osti(
+                convert_to_osti_search(
+                    {
+                        "q": search["query"],
+                        "earliest_year": search.get("earliest_year"),
+                        "latest_year": search.get("latest_year"),
+                        "report": search.get("report") or None,
+                        "maxcount": search.get("max_count", 15),
+                    }
+                )
+            )
+        return rag_retrieval(**search, query_embedding=query_embedding)
+    except Exception as e:
+        print(f"Error in batch search for query '{search.get('query')}': {e}")
+        return {"query": search.get("query"), "error": str(e)}
+
+
+def _rag_retrieval_events(
+        query: str,
+        dataset: str = "",
+        report: str = "",
+        earliest_year: int | str = None,
+        latest_year: int | str = None,
+        max_count: int = 15,
+        diversity: float = 0.0,
+        max_excerpts_per_report: int = 30,
+        recall: float = 0.5,
+        search_mode: str = "semantic",
+        diversity_mode: str = "source",
+        query_embedding: list[float] | None = None,
+        min_similarity: float = 0.0,
+        score_cutoff: str = "none",
+        graph_expansion: int = 0,
+) -> Iterator[dict]:
+    """
+    Run the full RAG retrieval pipeline without caching,
+    yielding events as stages finish. See `stream_rag_retrieval`.
+    """
+
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Invalid search mode: '{search_mode}'.")
+    if diversity_mode not in DIVERSITY_MODES:
+        raise ValueError(f"Invalid diversity mode: '{diversity_mode}'.")
+    if score_cutoff not in SCORE_CUTOFFS:
+        raise ValueError(f"Invalid score cutoff: '{score_cutoff}'.")
+
+    start_time = time()
+
+    # searches are summarized by the sampled log_rag_results, so this is only for debugging
+    logger.debug(
+        f"RAG search: query={query!r} dataset={dataset!r} report={report!r} earliest_year={earliest_year} latest_year={latest_year} diversity={diversity} max_count={max_count} search_mode={search_mode} diversity_mode={diversity_mode} min_similarity={min_similarity} score_cutoff={score_cutoff} graph_expansion={graph_expansion}"
+    )
+
+    stages = StageRunner()
 
     # If searching for a single report, return the single report and circumvent the rest of the search process.
-    # This performs semantic search over all report names and selects the top match.
+    # This matches the report name to the report titles and embeddings in the in-memory report index.
     if report and dataset:
         try:
-            query_embedding = create_embeddings([report])[0]
-            datasource_id = get_data_source_id(dataset)
+            report_id = stages.run(
+                "report_lookup", REPORT_INDEX.find_report, dataset, report
+            )
             with Session(engine) as session:
-                with log_time("Executing specific report search"):
+                with log_time("Executing specific report search", stage="report_search"):
                     _report = session.exec(
-                        select(Report)
-                        .where(Report.source_id == datasource_id)
-                        .order_by(Report.embedding.cosine_distance(query_embedding))
-                        .limit(1)
+                        select_table(Report, include={"report_metadata"}).where(
+                            Report.id == report_id
+                        )
                     ).one()
-                with log_time("Executing specific report excerpt search"):
+                with log_time(
+                    "Executing specific report excerpt search", stage="report_excerpts"
+                ):
                     _excerpts = session.exec(
-                        select(Excerpt)
+                        select_table(Excerpt, include={"json_content"})
                         .where(Excerpt.report_id == _report.id)
                         .order_by(Excerpt.excerpt_index)
                         .limit(max_excerpts_per_report)
                     ).all()
-                with log_time("Serializing specific report"):
+                with log_time("Serializing specific report", stage="serialization"):
                     return_report = {
                         **serialize_with_type(_report, "report"),
                         "source": serialize_with_type(_report.source, "source"),
@@ -416,15 +1106,26 @@ def rag_retrieval(
                         }
                         for e in return_report["excerpts"]
                     ]
-                return {
-                    "query": query,
-                    "diversity": diversity,
-                    "excerpts": return_excerpts,
-                    "reports": [{**return_report, "match": "report_title"}],
-                    "ragElapsedSeconds": round(time() - start_time, 2),
-                }
         except Exception as e:
             print(f"Error trying to find specific report: {e}")
+        else:
+            yield {"event": "excerpts", "stage": "report", "excerpts": return_excerpts}
+            yield {
+                "event": "reports",
+                "stage": "report",
+                "reports": [{**return_report, "match": "report_title"}],
+            }
+            yield {
+                "event": "done",
+                "query": query,
+                "diversity": diversity,
+                "similarityScores": [],
+                "indexThreshold": None,
+                "ragElapsedSeconds": round(time() - start_time, 2),
+                "stageElapsedSeconds": dict(stages.elapsed_seconds),
+                "failedStages": list(stages.failed),
+            }
+            return
 
     # TODO: make this robust against data that might not be in the correct date range.
     # We currently only have data for 2023 in EIA, so we can't ask about later years.
@@ -435,64 +1136,219 @@ def rag_retrieval(
     if dataset:
         diversity = 0.0
 
-    # get top-matching excerpts by semantic vector search
-    excerpt_dicts = semantic_search_router(
-        query,
-        dataset=dataset,
-        diversity=diversity,
-        earliest_year=earliest_year,
-        max_count=max_count,
-    )
-
-    with log_time("Getting parent reports from semantic search results"):
-        # get all reports that contain the top-matching excerpts
-        parent_report_dicts = [
-            {**d["report"], "source": d["source"]} for d in excerpt_dicts
-        ]
-
-    with log_time("Performing string search over report titles and identifiers"):
+    # Queries made up of literal identifiers, like CVE IDs, are answered by exact
+    # lookups, without creating a query embedding or running a vector search.
+    exact_excerpt_dicts, exact_report_dicts = [], []
+    identifiers = parse_identifiers(query)
+    if identifiers:
+        exact_excerpt_dicts, exact_report_dicts = stages.result(
+            stages.submit(
+                "identifier_lookup",
+                identifier_lookup,
+                identifiers,
+                dataset=dataset,
+                earliest_year=earliest_year,
+                latest_year=latest_year,
+                max_count=max_count,
+            ),
+            default=([], []),
+        )
+    # Fall back to the full search if nothing matches the identifiers
+    use_exact_matches = bool(exact_excerpt_dicts or exact_report_dicts)
+    similarity_scores, index_threshold = [], None
+
+    if use_exact_matches:
+        excerpt_stage, report_stage = "identifier_lookup", "identifier_lookup"
+        excerpt_dicts = exact_excerpt_dicts
+    else:
+        excerpt_stage, report_stage = "semantic_search", "string_search"
+        # Start the stages that don't depend on each other.
+        # Each stage opens its own session, so they run on separate pooled connections.
+        if query_embedding is None:
+            embedding_stage = stages.submit("query_embedding", embed_query, query)
+        source_ids_stage = stages.submit(
+            "source_ids", _lookup_source_ids, dataset, diversity, diversity_mode
+        )
         # get any reports titles or identifiers that match the query string
-        string_match_report_dicts = string_search_over_reports(
+        string_search_stage = stages.submit(
+            "string_search",
+            string_search_over_reports,
             query,
             dataset=dataset,
             earliest_year=earliest_year,
+            latest_year=latest_year,
             max_count=5,
         )
+        # get excerpts that contain the exact words of the query
+        if search_mode == "hybrid":
+            lexical_search_stage = stages.submit(
+                "lexical_search",
+                lexical_search_over_excerpts,
+                query,
+                dataset=dataset,
+                earliest_year=earliest_year,
+                latest_year=latest_year,
+                max_count=max_count,
+            )
+
+        # get top-matching excerpts by semantic vector search
+        datasource_id, all_source_ids = stages.result(
+            source_ids_stage, default=(None, None)
+        )
+        excerpt_dicts = stages.run(
+            "semantic_search",
+            semantic_search_router,
+            query,
+            dataset=dataset,
+            diversity=diversity,
+            earliest_year=earliest_year,
+            latest_year=latest_year,
+            max_count=max_count,
+            recall=recall,
+            diversity_mode=diversity_mode,
+            query_embedding=(
+                stages.result(embedding_stage)
+                if query_embedding is None
+                else query_embedding
+            ),
+            datasource_id=datasource_id,
+            all_source_ids=all_source_ids,
+            min_similarity=min_similarity,
+        )
 
+        # find where the similarity scores level off into weak matches
+        similarity_scores = sorted(
+            (d["similarityScore"] for d in excerpt_dicts if "similarityScore" in d),
+            reverse=True,
+        )
+        index_threshold = find_knee_index(similarity_scores)
+        if score_cutoff == "knee" and index_threshold is not None:
+            min_score = similarity_scores[
+                min(max(index_threshold, KNEE_MIN_COUNT - 1), len(similarity_scores) - 1)
+            ]
+            excerpt_dicts = [
+                d for d in excerpt_dicts if d.get("similarityScore", 1.0) >= min_score
+            ]
+
+        if search_mode == "hybrid":
+            # merge the vector and lexical search results by their ranks
+            lexical_excerpt_dicts = stages.result(lexical_search_stage, default=[])
+            excerpt_dicts = reciprocal_rank_fusion(
+                [excerpt_dicts, lexical_excerpt_dicts],
+                max_count=max(max_count, len(excerpt_dicts)),
+            )
+
+    yield {"event": "excerpts", "stage": excerpt_stage, "excerpts": excerpt_dicts}
+
+    # Add excerpts that are linked to the matches through co-occurring entities
+    if graph_expansion and graph_expansion > 0 and not use_exact_matches:
+        graph_excerpt_dicts = stages.result(
+            stages.submit(
+                "graph_expansion",
+                entity_graph_expansion,
+                [d["id"] for d in excerpt_dicts],
+                dataset=dataset,
+                earliest_year=earliest_year,
+                latest_year=latest_year,
+                max_count=graph_expansion,
+                datasource_id=datasource_id,
+            ),
+            default=[],
+        )
+        yield {
+            "event": "excerpts",
+            "stage": "graph_expansion",
+            "excerpts": graph_excerpt_dicts,
+        }
+        excerpt_dicts = [*excerpt_dicts, *graph_excerpt_dicts]
+
+    # Reports that match the query string are listed before the parent reports
+    if use_exact_matches:
+        string_match_report_dicts = exact_report_dicts
+    else:
+        string_match_report_dicts = stages.result(string_search_stage, default=[])
+    string_match_report_dicts = remove_duplicate_dict_values(
+        string_match_report_dicts, key="id"
+    )
+    yield {
+        "event": "reports",
+        "stage": report_stage,
+        "reports": string_match_report_dicts,
+    }
+
+    with log_time("Getting parent reports from semantic search results"):
+        # get all reports that contain the top-matching excerpts
+        parent_report_dicts = [
+            {**d["report"], "source": d["source"]} for d in excerpt_dicts
+        ]
+    # Deduplicate returned reports
     return_reports = remove_duplicate_dict_values(
         [*string_match_report_dicts, *parent_report_dicts],
         key="id",
     )
+    yield {
+        "event": "reports",
+        "stage": excerpt_stage,
+        "reports": return_reports[len(string_match_report_dicts):],
+    }
 
-    with log_time("Getting excerpts from reports"):
-        # Get excerpts that are contained in the returned reports
-        child_excerpts = get_excerpts_from_reports(return_reports)
+    # Get excerpts that are contained in the returned reports
+    child_excerpts = stages.result(
+        stages.submit("report_excerpts", get_excerpts_from_reports, return_reports),
+        default=[],
+    )
 
-    # Deduplicate returned reports and excerpts
+    # Deduplicate returned excerpts
     return_excerpts = remove_duplicate_dict_values(
         [*excerpt_dicts, *child_excerpts],
         key="id",
     )
+    yield {
+        "event": "excerpts",
+        "stage": "report_excerpts",
+        "excerpts": return_excerpts[len(excerpt_dicts):],
+    }
 
     elapsed_seconds = round(time() - start_time, 2)
-    print(f"RAG search total time: {elapsed_seconds} seconds")
 
-    return_results: dict = {
+    yield {
+        "event": "done",
         "query": query,
         "diversity": diversity,
-        "excerpts": return_excerpts,
-        "reports": return_reports,
+        "similarityScores": similarity_scores,
+        "indexThreshold": index_threshold,
         "ragElapsedSeconds": elapsed_seconds,
+        "stageElapsedSeconds": dict(stages.elapsed_seconds),
+        "failedStages": list(stages.failed),
     }
 
-    print(return_results)
-    return return_results
+
+def _lookup_source_ids(
+        dataset: str = "",
+        diversity: float = 0.0,
+        diversity_mode: str = "source",
+) -> tuple[str | None, list[str] | None]:
+    """
+    Look up the data source IDs that a semantic search filters or groups by.
+    Returns the ID of the dataset, if one is given, and the IDs of all
+    data sources, if the search adds synthetic diversity by data source.
+    """
+    if dataset:
+        try:
+            return get_data_source_id(dataset), None
+        except ValueError:
+            # semantic_search_router reports the invalid dataset
+            return None, None
+    if diversity >= 0.1 and diversity_mode == "source":
+        return None, get_all_data_source_ids()
+    return None, None
 
 
 def string_search_over_reports(
         search_string: str,
         dataset: str = "",
         earliest_year: int | str = None,
+        latest_year: int | str = None,
         max_count: int = 5,
 ) -> list[dict]:
     """
@@ -500,20 +1356,31 @@ def string_search_over_reports(
     This helps augment the vectorsearch if there is a small
     string match that doesn't get surfaced during a vector search
     of a large section of text.
+
+    Substring matches are found using the trigram indexes on report titles
+    and identifiers, and are ranked by their trigram similarity to the
+    search string, so the closest matches are returned first.
     """
     # skip this search if the search string is too short
     if len(search_string) < 5:
         return []
     pattern = f"%{search_string}%"
+    similarity = func.greatest(
+        func.coalesce(func.similarity(Report.title, search_string), 0),
+        func.coalesce(func.similarity(Report.identifier, search_string), 0),
+    )
     with Session(engine) as session:
-        base_query = select(Report).filter(
-            or_(Report.title.ilike(pattern), Report.identifier.ilike(pattern))
+        base_query = (
+            select_table(Report, include={"report_metadata"})
+            .filter(or_(Report.title.ilike(pattern), Report.identifier.ilike(pattern)))
+            .order_by(similarity.desc(), Report.id)
         )
 
         base_query = append_date_filter_to_query(
             base_query,
             table_name="report",
             earliest_year=earliest_year,
+            latest_year=latest_year,
         )
 
         if dataset:
@@ -528,6 +1395,194 @@ def string_search_over_reports(
         return serialized_results
 
 
+def identifier_lookup(
+        identifiers: list[str],
+        dataset: str = "",
+        earliest_year: int | str = None,
+        latest_year: int | str = None,
+        max_count: int = 15,
+) -> tuple[list[dict], list[dict]]:
+    """
+    Look up literal identifiers, like CVE IDs, CISA advisory IDs and EIA series IDs,
+    using the indexes on report identifiers and excerpt titles.
+    Excerpts match if their title is an identifier or starts with an identifier
+    followed by a space, like the CVE excerpts of CISA advisories.
+    Returns the matching excerpts and the matching reports.
+    """
+    excerpt_filter = or_(
+        Excerpt.title.in_(identifiers),
+        *[Excerpt.title.startswith(f"{i} ", autoescape=True) for i in identifiers],
+    )
+    queries = {
+        "excerpt": select_table(Excerpt, include={"json_content"}).where(
+            excerpt_filter
+        ),
+        "report": select_table(Report, include={"report_metadata"}).where(
+            Report.identifier.in_(identifiers)
+        ),
+    }
+    results = {}
+    with Session(engine) as session:
+        for table_name, base_query in queries.items():
+            table = TableIndex.get_table(table_name)
+            base_query = append_date_filter_to_query(
+                base_query,
+                table_name=table_name,
+                earliest_year=earliest_year,
+                latest_year=latest_year,
+            )
+            if dataset:
+                try:
+                    datasource_id = get_data_source_id(dataset)
+                    base_query = base_query.where(table.source_id == datasource_id)
+                except (AttributeError, ValueError):
+                    print(f"Error trying to filter by dataset '{dataset}'")
+                    pass
+            rows = session.exec(
+                base_query.order_by(table.published_at.desc().nulls_last(), table.id)
+                .limit(max_count)
+            ).all()
+            results[table_name] = process_relationships(rows, table_name)
+    return results["excerpt"], results["report"]
+
+
+def lexical_search_over_excerpts(
+        search_string: str,
+        dataset: str = "",
+        earliest_year: int | str = None,
+        latest_year: int | str = None,
+        max_count: int = 15,
+) -> list[dict]:
+    """
+    Perform full text search over excerpt descriptions and text content.
+    This finds exact tokens, like CVE numbers, vendor names and EIA series IDs,
+    that can be missed by vector search. The query string supports web search
+    syntax, like "quoted phrases" and -excluded words. Matches are ranked by
+    how often and how closely together the query words appear in each excerpt.
+    """
+    search_vector = Excerpt.search_vector
+    ts_query = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, search_string)
+    with Session(engine) as session:
+        base_query = select_table(Excerpt, include={"json_content"}).where(
+            search_vector.bool_op("@@")(ts_query)
+        )
+
+        base_query = append_date_filter_to_query(
+            base_query,
+            table_name="excerpt",
+            earliest_year=earliest_year,
+            latest_year=latest_year,
+        )
+
+        if dataset:
+            try:
+                datasource_id = get_data_source_id(dataset)
+                base_query = base_query.where(Excerpt.source_id == datasource_id)
+            except (AttributeError, ValueError):
+                print(f"Error trying to filter by dataset '{dataset}'")
+                pass
+        base_query = base_query.order_by(
+            func.ts_rank_cd(search_vector, ts_query).desc(), Excerpt.id
+        )
+        results = session.exec(base_query.limit(max_count)).all()
+        serialized_results = process_relationships(results, "excerpt")
+        return serialized_results
+
+
+def entity_graph_expansion(
+        excerpt_ids: list[str],
+        dataset: str = "",
+        earliest_year: int | str = None,
+        latest_year: int | str = None,
+        max_count: int = 5,
+        datasource_id: str | None = None,
+        n_neighbors: int = GRAPH_EXPANSION_NEIGHBORS,
+) -> list[dict]:
+    """
+    Expand search results through the entity co-occurrence graph. The unique entities
+    extracted from the given excerpts are looked up, then the n_neighbors entities that
+    co-occur with them most often, and the excerpts that link them are returned, from
+    the most frequent pair to the least. Every step is an indexed lookup, so the entity
+    table is never joined to itself at search time. Hub entities, of the types in
+    GRAPH_EXPANSION_EXCLUDED_ENTITY_TYPES like dates, are neither seeds nor neighbors.
+    Excerpts that are already in the given results are skipped, and each returned
+    excerpt has a "match" key of "entity_graph".
+    """
+    if not excerpt_ids or max_count <= 0:
+        return []
+    with Session(engine) as session:
+        seed_ids = session.exec(
+            select(distinct(Entity.uentity_id)).where(Entity.excerpt_id.in_(excerpt_ids))
+        ).all()
+        if not seed_ids:
+            return []
+
+        # Most frequently co-occurring entities of each seed entity, correlated
+        # to the outer seed row, so each seed is one index lookup
+        excluded_types = GRAPH_EXPANSION_EXCLUDED_ENTITY_TYPES
+        seeds = (
+            select(UEntity.id)
+            .where(UEntity.id.in_(seed_ids))
+            .where(func.upper(UEntity.entity_type).not_in(excluded_types))
+            .subquery("seeds")
+        )
+        neighbors = (
+            select(EntityCooccurrence.n_excerpts, EntityCooccurrence.excerpt_ids)
+            .join(UEntity, UEntity.id == EntityCooccurrence.other_uentity_id)
+            .where(EntityCooccurrence.uentity_id == seeds.c.id)
+            .where(EntityCooccurrence.other_uentity_id.not_in(seed_ids))
+            .where(func.upper(UEntity.entity_type).not_in(excluded_types))
+            .correlate(seeds)
+            .order_by(EntityCooccurrence.n_excerpts.desc())
+            .limit(n_neighbors)
+            .lateral("neighbors")
+        )
+        with log_time("Entity graph neighbors query"):
+            rows = session.execute(
+                select(neighbors.c.excerpt_ids)
+                .select_from(seeds)
+                .join(neighbors, true())
+                .order_by(neighbors.c.n_excerpts.desc())
+                .limit(n_neighbors)
+            ).all()
+
+        candidate_ids, seen_ids = [], set(excerpt_ids)
+        for row in rows:
+            for excerpt_id in row.excerpt_ids or []:
+                if excerpt_id not in seen_ids:
+                    seen_ids.add(excerpt_id)
+                    candidate_ids.append(excerpt_id)
+        if not candidate_ids:
+            return []
+
+        # Filter the linked excerpts by date and dataset before loading them
+        id_query = append_date_filter_to_query(
+            select(Excerpt.id).where(Excerpt.id.in_(candidate_ids)),
+            table_name="excerpt",
+            earliest_year=earliest_year,
+            latest_year=latest_year,
+        )
+        if dataset:
+            try:
+                datasource_id = datasource_id or get_data_source_id(dataset)
+                id_query = id_query.where(Excerpt.source_id == datasource_id)
+            except (AttributeError, ValueError):
+                print(f"Error trying to filter by dataset '{dataset}'")
+                pass
+        matching_ids = set(session.exec(id_query).all())
+        selected_ids = [i for i in candidate_ids if i in matching_ids][:max_count]
+
+        with log_time("Entity graph excerpts query"):
+            results = select_by_ranked_ids(
+                session,
+                select_table(Excerpt, include={"json_content"}),
+                Excerpt,
+                selected_ids,
+            )
+            results = process_relationships(results, "excerpt")
+        return [{**r, "match": "entity_graph"} for r in results]
+
+
 if __name__ == "__main__":
 
     if 1:
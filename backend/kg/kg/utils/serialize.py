@@ -1,14 +1,73 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
-from sqlmodel import SQLModel
+from time import monotonic
+from datetime import date, datetime
+from typing import Callable
+from collections import defaultdict
+from sqlmodel import SQLModel, Session, select, func
+from sqlalchemy import inspect
+from sqlalchemy.orm import RelationshipDirection
 from sqlalchemy.engine.row import RowMapping
 from fastapi.encoders import jsonable_encoder
+from kg.engine import engine
 from kg.table_index import TableIndex
 from kg.utils.clean import remove_keys
+from kg.utils.query import embedding_deferred_options
+from kg.utils.metrics import observe_stage
+
+
+# Functions that get already serialized objects of a table by ID, by table name
+_SERIALIZED_PARENTS: dict[str, Callable[[set[str]], dict[str, dict]]] = {}
+
+
+def register_serialized_parents(
+    table_name: str, get_serialized: Callable[[set[str]], dict[str, dict]]
+) -> None:
+    """
+    Register a function that gets serialized objects of a table by ID, which is
+    used instead of loading and serializing those objects as parent relations.
+    """
+    _SERIALIZED_PARENTS[table_name] = get_serialized
+
+
+# Per-table plans of the fields that are serialized, by table and excluded keys
+_FIELD_PLANS: dict[tuple[type, frozenset[str]], tuple[str, ...]] = {}
+
+
+def get_field_plan(table: type[SQLModel], exclude_keys: set[str]) -> tuple[str, ...]:
+    """
+    Get the names of the fields of a table that are serialized, in order.
+    Plans are built once from the table's model fields and reused.
+    """
+    key = (table, frozenset(exclude_keys))
+    plan = _FIELD_PLANS.get(key)
+    if plan is None:
+        plan = tuple(name for name in table.model_fields if name not in exclude_keys)
+        _FIELD_PLANS[key] = plan
+    return plan
+
+
+def encode_value(value):
+    """Convert a column value into a JSON-compatible value."""
+    if value is None or isinstance(value, (str, int, float, bool, dict, list)):
+        return value
+    # dates and datetimes are formatted the same way as by jsonable_encoder
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return jsonable_encoder(value)
 
 
 def serialize(obj, exclude_keys: set[str] = {"embedding", "entities"}):
     """Conveniently serialize an object without certain keys."""
+    if isinstance(obj, SQLModel):
+        # columns that were deferred and never loaded from the database
+        # are missing from the instance dict, and are left out
+        values = obj.__dict__
+        return {
+            name: encode_value(values[name])
+            for name in get_field_plan(type(obj), exclude_keys)
+            if name in values
+        }
     obj = remove_keys(obj, exclude_keys)
     return jsonable_encoder(obj, exclude=exclude_keys)
 
@@ -30,29 +89,128 @@ def serialize_with_type(
 def process_relationships(
     row: SQLModel | list[SQLModel], table_name: str, max_count=50
 ) -> dict:
-    """Process and add relationship data to the serialized object."""
+    """
+    Process and add relationship data to the serialized object.
+    Related objects of all the rows are loaded in one query per relation,
+    and to-many relations are limited to `max_count` objects per row in SQL.
+    """
+    rows = row if isinstance(row, list) else [row]
+    table = TableIndex.get_table(table_name)
+
+    start = monotonic()
+    serialized_rows = [serialize_with_type(_row, table_name) for _row in rows]
+    observe_stage("serialization", monotonic() - start)
+    if rows:
+        start = monotonic()
+        session = Session.object_session(rows[0])
+        if session is None:
+            with Session(engine) as session:
+                _add_relationships(session, table, rows, serialized_rows, max_count)
+        else:
+            _add_relationships(session, table, rows, serialized_rows, max_count)
+        observe_stage("relationship_loading", monotonic() - start)
+
+    return serialized_rows if isinstance(row, list) else serialized_rows[0]
+
+
+def _add_relationships(
+    session: Session,
+    table: SQLModel,
+    rows: list[SQLModel],
+    serialized_rows: list[dict],
+    max_count: int,
+) -> None:
+    """Load the related objects of every relation and add them to the serialized rows."""
     relation_to_model_map = {
         "uentities": "uentity",
         "entities": "entity",
         "excerpts": "excerpt",
         "reports": "report",
     }
-    relations = TableIndex.get_table(table_name).RELATIONS
-
-    if isinstance(row, list):
-        return [
-            process_relationships(_row, table_name, max_count=max_count) for _row in row
-        ]
-
-    serialized_row = serialize_with_type(row, table_name)
-    for relation in relations:
-        relation_data = getattr(row, relation)
+    for relation in table.RELATIONS:
         relation_type = relation_to_model_map.get(relation, relation)
-        if isinstance(relation_data, list):
-            relation_data = relation_data[:max_count] if relation_data else []
-            serialized_row[relation] = [
-                serialize_with_type(item, relation_type) for item in relation_data
-            ]
+        relationship = inspect(table).relationships[relation]
+        if relationship.direction == RelationshipDirection.MANYTOONE:
+            foreign_key = list(relationship.local_columns)[0].key
+            parent_ids = {getattr(_row, foreign_key) for _row in rows} - {None}
+            if relation_type in _SERIALIZED_PARENTS:
+                serialized_parents = _SERIALIZED_PARENTS[relation_type](parent_ids)
+            else:
+                related = _load_parents(
+                    session, TableIndex.get_table(relation_type), parent_ids
+                )
+                # serialize each parent once, even if several rows share it
+                serialized_parents = {
+                    parent_id: serialize_with_type(parent, relation_type)
+                    for parent_id, parent in related.items()
+                }
+            for _row, serialized_row in zip(rows, serialized_rows):
+                parent = serialized_parents.get(getattr(_row, foreign_key))
+                serialized_row[relation] = dict(parent) if parent else None
         else:
-            serialized_row[relation] = serialize_with_type(relation_data, relation_type)
-    return serialized_row
+            foreign_key = list(relationship.remote_side)[0].key
+            related = _load_children(
+                session,
+                TableIndex.get_table(relation_type),
+                foreign_key,
+                {_row.id for _row in rows},
+                max_count,
+            )
+            for _row, serialized_row in zip(rows, serialized_rows):
+                serialized_row[relation] = [
+                    serialize_with_type(child, relation_type)
+                    for child in related.get(_row.id, [])
+                ]
+
+
+def _load_parents(
+    session: Session, parent_table: SQLModel, parent_ids: set[str]
+) -> dict[str, SQLModel]:
+    """Load parent objects by ID in a single query."""
+    parent_ids = {i for i in parent_ids if i is not None}
+    if not parent_ids:
+        return {}
+    parents = session.exec(
+        select(parent_table)
+        .options(*embedding_deferred_options(parent_table))
+        .where(parent_table.id.in_(parent_ids))
+    ).all()
+    return {parent.id: parent for parent in parents}
+
+
+def _load_children(
+    session: Session,
+    child_table: SQLModel,
+    foreign_key: str,
+    parent_ids: set[str],
+    max_count: int,
+) -> dict[str, list[SQLModel]]:
+    """
+    Load up to `max_count` child objects for each parent in a single query,
+    using a window function to number the children of each parent.
+    """
+    if not parent_ids:
+        return {}
+    foreign_key_column = getattr(child_table, foreign_key)
+    order_column = getattr(child_table, "excerpt_index", child_table.added_at)
+    numbered = (
+        select(
+            child_table.id.label("id"),
+            func.row_number()
+            .over(partition_by=foreign_key_column, order_by=order_column)
+            .label("row_number"),
+        )
+        .where(foreign_key_column.in_(parent_ids))
+        .subquery()
+    )
+    children = session.exec(
+        select(child_table)
+        .options(*embedding_deferred_options(child_table))
+        .join(numbered, child_table.id == numbered.c.id)
+        .where(numbered.c.row_number <= max_count)
+        .order_by(foreign_key_column, numbered.c.row_number)
+    ).all()
+    related = defaultdict(list)
+    for child in children:
+        related[getattr(child, foreign_key)].append(child)
+    return related
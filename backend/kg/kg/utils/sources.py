@@ -0,0 +1,121 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+In-process registry of the data sources. The source table only has a few rows,
+which only change when the tables are seeded, so the sources are kept in memory
+and reloaded when the data version changes. An unknown source reloads them once
+per data version, and later unknown sources of that version are known misses.
+"""
+
+import threading
+from sqlmodel import Session, select
+from kg.engine import engine
+from kg.tables import Source
+from kg.utils.version import get_data_version
+from kg.utils.cache import HitCounter, register_cache_stats
+from kg.utils.serialize import serialize_with_type, register_serialized_parents
+
+
+class SourceRegistry:
+    """
+    Data source IDs by abbreviation, and serialized data sources by ID.
+
+    Example:
+    source_id = SOURCE_REGISTRY.get_id("EIA")
+    source = SOURCE_REGISTRY.get_serialized({source_id})[source_id]
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids: dict[str, str] = {}
+        self._serialized: dict[str, dict] = {}
+        # data version that was already reloaded because of an unknown source
+        self._missed_version = None
+        self.counter = HitCounter()
+        register_cache_stats("source_registry", self.stats)
+
+    def refresh(self, force: bool = False) -> None:
+        """Reload the data sources if the data version has changed since they were loaded."""
+        version = get_data_version()
+        if version == self._version and not force:
+            return
+        with self._lock:
+            # another thread may have reloaded the sources while this one waited
+            if version == self._version and not force:
+                return
+            with Session(engine) as session:
+                sources = session.exec(select(Source)).all()
+                serialized = {s.id: serialize_with_type(s, "source") for s in sources}
+            # swap in the new sources all at once, so readers never see a partial registry
+            self._serialized = serialized
+            self._ids = {
+                s["abbreviation"].upper(): s["id"] for s in serialized.values()
+            }
+            self._version = version
+
+    def get_id(self, abbreviation: str) -> str:
+        """Get the ID of a data source from its abbreviation."""
+        self.refresh()
+        source_id = self._ids.get(abbreviation.upper())
+        if source_id is None:
+            self.counter.miss()
+            if self._reload_on_miss():
+                source_id = self._ids.get(abbreviation.upper())
+        else:
+            self.counter.hit()
+        if not source_id:
+            raise ValueError(f"No '{abbreviation}' data source exists database.")
+        return source_id
+
+    def get_ids(self) -> list[str]:
+        """Get the IDs of all data sources, in sorted order."""
+        self.refresh()
+        self.counter.hit()
+        return sorted(self._serialized)
+
+    def get_serialized(self, source_ids: set[str]) -> dict[str, dict]:
+        """
+        Get the serialized data sources with the given IDs, by ID.
+        The dictionaries are shared, so copy them before modifying them.
+        """
+        self.refresh()
+        if not source_ids <= self._serialized.keys():
+            self.counter.miss()
+            self._reload_on_miss()
+        else:
+            self.counter.hit()
+        serialized = self._serialized
+        return {i: serialized[i] for i in source_ids if i in serialized}
+
+    def _reload_on_miss(self) -> bool:
+        """
+        Reload the data sources after an unknown source was requested, in case it was
+        added since the registry was loaded, unless this data version was already
+        reloaded for a miss. Misses are then cached until the data version changes,
+        so repeated requests for unknown sources don't query the database.
+        Returns whether the sources were reloaded.
+        """
+        version = self._version
+        with self._lock:
+            if version == self._missed_version:
+                return False
+            self._missed_version = version
+        self.refresh(force=True)
+        return True
+
+    def list_serialized(self) -> list[dict]:
+        """Get copies of all serialized data sources."""
+        self.refresh()
+        self.counter.hit()
+        return [dict(source) for source in self._serialized.values()]
+
+    def stats(self) -> dict:
+        """Return hit/miss statistics and the number of registered sources."""
+        return {**self.counter.stats(), "size": len(self._serialized)}
+
+
+# Data source registry shared by all searches in this process
+SOURCE_REGISTRY = SourceRegistry()
+
+register_serialized_parents("source", SOURCE_REGISTRY.get_serialized)
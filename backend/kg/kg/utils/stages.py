@@ -0,0 +1,139 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Run independent stages of a search concurrently on a shared thread pool.
+Each stage that touches the database opens its own session, so concurrent
+stages run on separate pooled connections.
+"""
+
+import logging
+import threading
+import concurrent.futures
+from time import monotonic
+from typing import Any, Callable
+from kg.settings import (
+    RAG_STAGE_WORKERS,
+    RAG_STAGE_TIMEOUT_SECONDS,
+    RAG_BATCH_WORKERS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+)
+from kg.utils.metrics import observe_stage
+
+
+# Each stage holds at most one database connection at a time, so stages are
+# limited to half of the engine's connections, which leaves the rest of the
+# pool for request threads and background work
+STAGE_WORKERS = max(1, min(RAG_STAGE_WORKERS, (DB_POOL_SIZE + DB_MAX_OVERFLOW) // 2))
+
+# Thread pool shared by all searches in this process
+STAGE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=STAGE_WORKERS,
+    thread_name_prefix="rag-stage",
+)
+
+# Thread pool for the searches of batch requests. Batch searches wait on their
+# own stages, so they run on a separate pool that can't starve the stage pool.
+BATCH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=RAG_BATCH_WORKERS,
+    thread_name_prefix="rag-batch",
+)
+
+# Marker for stages whose failure should fail the whole search
+REQUIRED = object()
+
+
+class StageTimeoutError(TimeoutError):
+    """A stage that the search requires didn't finish within its timeout."""
+
+
+class _StageClock:
+    """The time a stage started running, which is set by the thread running it."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.start = 0.0
+
+    def set(self) -> None:
+        self.start = monotonic()
+        self.started.set()
+
+
+class StageRunner:
+    """
+    Run the stages of a single search, recording how long each stage takes
+    and which stages failed or timed out.
+
+    Stages are given `timeout_seconds` from the moment they start running, so
+    time spent waiting for a free worker isn't counted. A stage that times out
+    keeps running in the background, but its result is ignored. A required
+    stage that times out raises StageTimeoutError.
+
+    Example:
+    stages = StageRunner()
+    embedding = stages.submit("query_embedding", embed_query, query)
+    reports = stages.submit("string_search", string_search_over_reports, query)
+    query_embedding = stages.result(embedding)
+    report_dicts = stages.result(reports, default=[])
+    stages.elapsed_seconds
+    # returns {"query_embedding": 0.012, "string_search": 0.034}
+    """
+
+    def __init__(self, timeout_seconds: float = RAG_STAGE_TIMEOUT_SECONDS):
+        self.timeout_seconds = timeout_seconds
+        self.elapsed_seconds: dict[str, float] = {}
+        self.failed: list[str] = []
+        self._stages: dict[concurrent.futures.Future, tuple[str, _StageClock]] = {}
+
+    def _timed(
+        self, stage: str, clock: _StageClock, function: Callable, *args, **kwargs
+    ) -> Any:
+        clock.set()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = monotonic() - clock.start
+            self.elapsed_seconds[stage] = round(elapsed, 3)
+            observe_stage(stage, elapsed)
+            logging.debug(f"{elapsed:.2f} SECONDS: stage '{stage}'")
+
+    def submit(
+        self, stage: str, function: Callable, *args, **kwargs
+    ) -> concurrent.futures.Future:
+        """Start running a stage in the background."""
+        clock = _StageClock()
+        future = STAGE_EXECUTOR.submit(
+            self._timed, stage, clock, function, *args, **kwargs
+        )
+        self._stages[future] = (stage, clock)
+        return future
+
+    def run(self, stage: str, function: Callable, *args, **kwargs) -> Any:
+        """Run a stage that has nothing left to overlap with, and wait for its result."""
+        return self.result(self.submit(stage, function, *args, **kwargs))
+
+    def result(self, future: concurrent.futures.Future, default: Any = REQUIRED) -> Any:
+        """
+        Wait for the result of a stage. If the stage fails or times out,
+        return `default`, or raise the error if the stage is required.
+        """
+        stage, clock = self._stages[future]
+        try:
+            # the timeout starts when a worker picks the stage up, not when it's queued
+            clock.started.wait()
+            deadline = clock.start + self.timeout_seconds
+            return future.result(timeout=max(0.0, deadline - monotonic()))
+        except Exception as e:
+            timed_out = isinstance(e, concurrent.futures.TimeoutError)
+            if timed_out:
+                print(f"Search stage '{stage}' timed out")
+            else:
+                print(f"Search stage '{stage}' failed: {e}")
+            self.failed.append(stage)
+            if default is not REQUIRED:
+                return default
+            if timed_out:
+                raise StageTimeoutError(
+                    f"Search stage '{stage}' timed out after {self.timeout_seconds} seconds"
+                ) from e
+            raise
@@ -0,0 +1,70 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Track the version of the knowledge graph data. The version is incremented
+each time data ingestion commits, and is used to invalidate caches.
+"""
+
+import threading
+from time import monotonic
+from datetime import datetime
+from sqlmodel import Session, select
+from sqlalchemy.dialects.postgresql import insert
+from kg.engine import engine
+from kg.tables import DataVersion
+from kg.settings import DATA_VERSION_REFRESH_SECONDS
+
+
+# ID of the single row in the data version table
+DATA_VERSION_ID = "kg"
+
+_lock = threading.Lock()
+_cached_version = None
+_cached_at = 0.0
+
+
+def get_data_version(refresh: bool = False) -> int:
+    """
+    Get the current version of the knowledge graph data.
+    The version is read from the database at most once every
+    DATA_VERSION_REFRESH_SECONDS, unless `refresh` is set.
+    """
+    global _cached_version, _cached_at
+    with _lock:
+        if (
+            refresh
+            or _cached_version is None
+            or monotonic() - _cached_at > DATA_VERSION_REFRESH_SECONDS
+        ):
+            with Session(engine) as session:
+                version = session.exec(
+                    select(DataVersion.version).where(DataVersion.id == DATA_VERSION_ID)
+                ).first()
+            _cached_version = version or 0
+            _cached_at = monotonic()
+        return _cached_version
+
+
+def bump_data_version() -> int:
+    """
+    Increment the knowledge graph data version and return the new version.
+    Call this after new data has been committed to the database.
+    """
+    global _cached_version, _cached_at
+    query = insert(DataVersion).values(
+        id=DATA_VERSION_ID, version=1, added_at=datetime.now()
+    )
+    query = query.on_conflict_do_update(
+        index_elements=[DataVersion.id],
+        set_={
+            "version": DataVersion.version + 1,
+            "added_at": query.excluded.added_at,
+        },
+    ).returning(DataVersion.version)
+    with Session(engine) as session:
+        version = session.execute(query).scalar_one()
+        session.commit()
+    with _lock:
+        _cached_version = version
+        _cached_at = monotonic()
+    return version
@@ -28,10 +28,12 @@ setup(
         "mdurl==0.1.2",
         "mypy-extensions==1.0.0",
         "numpy==2.2.0",
+        "orjson==3.10.12",
         "packaging==24.2",
         "pathspec==0.12.1",
         "pgvector==0.3.6",
         "platformdirs==4.3.6",
+        "prometheus_client==0.21.1",
         "psycopg2-binary==2.9.10",
         "pydantic==2.10.3",
         "pydantic_core==2.27.1",
@@ -1,16 +1,40 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
+import orjson
+import logging
 import uvicorn
-from fastapi import FastAPI, Query
+from time import monotonic
+from typing import Literal
+from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.docs import get_swagger_ui_html
 
 from settings import KG_API_PORT
 from kg.utils.osti_search import search_osti, SearchOSTIPayload
 from kg.initialize import initialize_tables
-from kg.utils.search import rag_retrieval, convert_to_osti_search
+from kg.utils.search import (
+    rag_retrieval,
+    stream_rag_retrieval,
+    batch_rag_retrieval,
+    normalize_rag_results,
+    rag_results_to_events,
+    end_rag_events_on_error,
+    convert_to_osti_search,
+)
+from kg.utils.cache import get_cache_stats
+from kg.utils.report_index import REPORT_INDEX
+from kg.utils.ann import EXCERPT_VECTOR_INDEX
+from kg.settings import USE_ANN_ACCELERATOR, RAG_BATCH_MAX_SEARCHES, LOG_LEVEL
+from kg.utils.metrics import REQUEST_SECONDS
+from kg.utils.stages import StageTimeoutError
+from kg.utils.query import get_invalid_columns
+from kg.table_index import TableIndex
 from kg.utils.read import (
     get_table_sizes,
     count_reports_by_source,
@@ -20,17 +44,32 @@ from kg.utils.read import (
     get_object,
 )
 
+# Log the sampled RAG search summaries, and per-search details when LOG_LEVEL is DEBUG
+logging.basicConfig(
+    level=LOG_LEVEL,
+    format="%(asctime)s.%(msecs)03d [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
 # Initialize the database if it hasn't been initialized yet.
 # This will create the database, install extensions,
 # and create the tables if they don't exist.
 initialize_tables()
 
+# Load the report title index so the first named-report search doesn't wait for it
+REPORT_INDEX.refresh()
+
+# Memory-map the exported excerpt vectors, or start exporting them in the background
+if USE_ANN_ACCELERATOR:
+    EXCERPT_VECTOR_INDEX.get()
+
 app = FastAPI(
     title="COREII Knowledge Graph API",
     description="A knwoeldge graph API for database queries and RAG.",
     version="1.0.0",
     contact={"name": "Idaho National Laboratory"},
     docs_url=None,
+    default_response_class=ORJSONResponse,
 )
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -43,6 +82,56 @@ app.add_middleware(
 )
 
 
+class JSONGZipMiddleware(GZipMiddleware):
+    """
+    Compress responses for clients that accept gzip, except streamed events.
+    Streamed events would wait in the compression buffer instead of reaching
+    clients as soon as each stage of a search finishes.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Compress large responses, like RAG results, with a moderate level to limit CPU use
+app.add_middleware(JSONGZipMiddleware, minimum_size=1000, compresslevel=5)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Record the response time of each request, labeled by its route. The time is
+    observed once the response body is sent, so streamed responses are measured
+    until their last chunk instead of their first.
+    """
+    start = monotonic()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    labels = REQUEST_SECONDS.labels(
+        request.method, getattr(route, "path", "unmatched"), response.status_code
+    )
+    body_iterator = response.body_iterator
+
+    async def observe_when_sent():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            labels.observe(monotonic() - start)
+
+    response.body_iterator = observe_when_sent()
+    return response
+
+
+@app.exception_handler(StageTimeoutError)
+async def stage_timeout_handler(request: Request, exc: StageTimeoutError) -> ORJSONResponse:
+    """Report a search whose required stage timed out as a gateway timeout."""
+    return ORJSONResponse({"detail": str(exc)}, status_code=504)
+
+
 @app.get(
     "/",
     tags=["Test"],
@@ -209,13 +298,27 @@ async def list_objects_(
         page_size: int = Query(
             10, description="Number of results per page (default is 10)."
         ),
-) -> dict:
-    return list_objects(
-        table_name,
-        constraint_key=constraint_key,
-        constraint_val=constraint_val,
-        page=page,
-        page_size=page_size,
+        columns: list[str] | None = Query(
+            None,
+            description="Optional list of columns to return. If not provided, all columns except vector embeddings and JSONB documents are returned.",
+        ),
+) -> ORJSONResponse:
+    # unknown table and column names are the client's error, not the server's
+    if table_name not in TableIndex.MAP:
+        raise HTTPException(status_code=422, detail=f"Invalid table name: '{table_name}'.")
+    invalid_columns = get_invalid_columns(TableIndex.MAP[table_name], columns or [])
+    if invalid_columns:
+        raise HTTPException(status_code=422, detail=f"Invalid column names: {invalid_columns}.")
+    # the results are already serialized, so they're returned without re-encoding them
+    return ORJSONResponse(
+        list_objects(
+            table_name,
+            constraint_key=constraint_key,
+            constraint_val=constraint_val,
+            page=page,
+            page_size=page_size,
+            columns=columns,
+        )
     )
 
 
@@ -231,13 +334,51 @@ async def get_object_(
             True,
             description="Whether to include parent objects (if applicable) in the response. Defaults to True.",
         ),
-) -> dict:
+) -> ORJSONResponse:
     """Get a single object from the database."""
-    return get_object(
-        table_name=table_name, object_id=object_id, include_parents=include_parents
+    return ORJSONResponse(
+        get_object(
+            table_name=table_name, object_id=object_id, include_parents=include_parents
+        )
     )
 
 
+@app.get(
+    "/cache-stats",
+    tags=["Read"],
+    responses={
+        200: {
+            "description": "string",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "cache_name": {
+                            "hits": "number",
+                            "misses": "number",
+                            "hitRate": "number",
+                            "size": "number",
+                            "maxsize": "number",
+                        }
+                    }
+                }
+            },
+        }
+    },
+)
+async def cache_stats() -> dict:
+    """Get hit and miss counts for the in-process and shared caches."""
+    return get_cache_stats()
+
+
+@app.get("/metrics", tags=["Read"])
+async def metrics() -> Response:
+    """
+    Get Prometheus metrics, including search stage latencies,
+    result sizes, database pool usage and cache hit rates.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get(
     "/rag-retrieval",
     tags=["Search"],
@@ -251,14 +392,18 @@ async def get_object_(
                         "diversity": "string",
                         "excerpts": [],
                         "reports": [],
+                        "similarityScores": [],
+                        "indexThreshold": "number",
                         "ragElapsedSeconds": "number",
+                        "stageElapsedSeconds": {},
+                        "failedStages": [],
                     }
                 }
             },
         }
     },
 )
-async def perform_rag_retrieval(
+def perform_rag_retrieval(
         q: str = Query(..., description="Search query for semantic retrieval."),
         dataset: str = Query(
             "",
@@ -272,6 +417,10 @@ async def perform_rag_retrieval(
             None,
             description="Optional filter to limit results to content from this year or later.",
         ),
+        latest_year: int | str = Query(
+            None,
+            description="Optional filter to limit results to content from this year or earlier.",
+        ),
         diversity: float = Query(
             0.0,
             description="Diversity factor (0.0 - 1.0) for search results. Higher values promote more diverse results.",
@@ -279,8 +428,40 @@ async def perform_rag_retrieval(
         maxcount: int | None = Query(
             15, description="Maximum number of search results to return. Defaults to 15."
         ),
-) -> dict:
-    """Perform retrieval for RAG by semantic search across multiple database tables."""
+        recall: float = Query(
+            0.5,
+            description="Vector search accuracy (0.0 - 1.0). Higher values are more accurate but slower.",
+        ),
+        search_mode: Literal["semantic", "hybrid"] = Query(
+            "semantic",
+            description="How to retrieve excerpts. 'hybrid' combines vector search with full text search, which finds exact terms like CVE numbers, vendor names and series IDs.",
+        ),
+        diversity_mode: Literal["source", "mmr"] = Query(
+            "source",
+            description="How to add diversity. 'source' returns top matches from each data source. 'mmr' re-ranks a pool of top matches so they aren't redundant with each other.",
+        ),
+        min_similarity: float = Query(
+            0.0,
+            description="Minimum similarity score (0.0 - 1.0) of semantic search matches. Weaker matches are left out. Defaults to 0.0 (no minimum).",
+        ),
+        score_cutoff: Literal["none", "knee"] = Query(
+            "none",
+            description="How to trim weak semantic search matches. 'knee' leaves out matches that score below the knee point of the similarity scores, so focused questions return fewer excerpts.",
+        ),
+        graph_expansion: int = Query(
+            0,
+            description="Maximum number of excerpts to add that are linked to the semantic search matches through their most frequently co-occurring entities. Defaults to 0 (no graph expansion).",
+        ),
+        response_format: Literal["nested", "normalized"] = Query(
+            "nested",
+            description="Shape of the results. 'nested' embeds the report and source in each excerpt. 'normalized' lists each source, report and excerpt once, keyed by ID, with references by ID, which makes responses much smaller. OSTI results are always returned as they are.",
+        ),
+) -> ORJSONResponse:
+    """
+    Perform retrieval for RAG by semantic search across multiple database tables.
+    This is a sync endpoint so the blocking search runs in the server's thread pool
+    instead of blocking the event loop for other requests.
+    """
 
     if dataset.lower() == "osti":
         parameters = {
@@ -288,19 +469,286 @@ async def perform_rag_retrieval(
             "dataset": dataset if dataset else None,
             "report": report if report else None,
             "earliest_year": earliest_year if earliest_year else None,
+            "latest_year": latest_year if latest_year else None,
             "maxcount": maxcount
         }
         payload = convert_to_osti_search(parameters)
-        return search_osti(payload)
+        results = search_osti(payload)
     else:
-        return rag_retrieval(
+        results = rag_retrieval(
             q,
             dataset=dataset,
             report=report,
             earliest_year=earliest_year,
+            latest_year=latest_year,
             max_count=maxcount,
             diversity=diversity,
+            recall=recall,
+            search_mode=search_mode,
+            diversity_mode=diversity_mode,
+            min_similarity=min_similarity,
+            score_cutoff=score_cutoff,
+            graph_expansion=graph_expansion,
         )
+        # OSTI results aren't excerpts from the knowledge graph, so they're
+        # always returned as they are
+        if response_format == "normalized":
+            results = normalize_rag_results(results)
+    # the results are already serialized, so they're returned without re-encoding them
+    return ORJSONResponse(results)
+
+
+@app.get(
+    "/rag-retrieval/stream",
+    tags=["Search"],
+    responses={
+        200: {
+            "description": "Newline-delimited JSON events",
+            "content": {
+                "application/x-ndjson": {
+                    "example": '{"event": "excerpts", "stage": "semantic_search", "excerpts": []}\n'
+                    '{"event": "reports", "stage": "string_search", "reports": []}\n'
+                    '{"event": "reports", "stage": "semantic_search", "reports": []}\n'
+                    '{"event": "excerpts", "stage": "report_excerpts", "excerpts": []}\n'
+                    '{"event": "done", "query": "string", "diversity": "string", "similarityScores": [], "indexThreshold": "number", "ragElapsedSeconds": "number", "stageElapsedSeconds": {}, "failedStages": []}\n'
+                }
+            },
+        }
+    },
+)
+def stream_rag_retrieval_(
+        q: str = Query(..., description="Search query for semantic retrieval."),
+        dataset: str = Query(
+            "",
+            description="Optional dataset name to restrict search results to a specific dataset.",
+        ),
+        report: str = Query(
+            "",
+            description="Optional report title to filter search results by a specific report.",
+        ),
+        earliest_year: int | str = Query(
+            None,
+            description="Optional filter to limit results to content from this year or later.",
+        ),
+        latest_year: int | str = Query(
+            None,
+            description="Optional filter to limit results to content from this year or earlier.",
+        ),
+        diversity: float = Query(
+            0.0,
+            description="Diversity factor (0.0 - 1.0) for search results. Higher values promote more diverse results.",
+        ),
+        maxcount: int | None = Query(
+            15, description="Maximum number of search results to return. Defaults to 15."
+        ),
+        recall: float = Query(
+            0.5,
+            description="Vector search accuracy (0.0 - 1.0). Higher values are more accurate but slower.",
+        ),
+        search_mode: Literal["semantic", "hybrid"] = Query(
+            "semantic",
+            description="How to retrieve excerpts. 'hybrid' combines vector search with full text search, which finds exact terms like CVE numbers, vendor names and series IDs.",
+        ),
+        diversity_mode: Literal["source", "mmr"] = Query(
+            "source",
+            description="How to add diversity. 'source' returns top matches from each data source. 'mmr' re-ranks a pool of top matches so they aren't redundant with each other.",
+        ),
+        min_similarity: float = Query(
+            0.0,
+            description="Minimum similarity score (0.0 - 1.0) of semantic search matches. Weaker matches are left out. Defaults to 0.0 (no minimum).",
+        ),
+        score_cutoff: Literal["none", "knee"] = Query(
+            "none",
+            description="How to trim weak semantic search matches. 'knee' leaves out matches that score below the knee point of the similarity scores, so focused questions return fewer excerpts.",
+        ),
+        graph_expansion: int = Query(
+            0,
+            description="Maximum number of excerpts to add that are linked to the semantic search matches through their most frequently co-occurring entities. Defaults to 0 (no graph expansion).",
+        ),
+) -> StreamingResponse:
+    """
+    Perform retrieval for RAG like `/rag-retrieval`, but stream the results as
+    newline-delimited JSON events while each stage of the search finishes:
+    semantic search excerpts, string match reports, parent reports, then
+    excerpts from the matching reports. The last event is a "done" event
+    with the search timings, or an "error" event if the search failed.
+    """
+
+    if dataset.lower() == "osti":
+        parameters = {
+            "q": q,
+            "dataset": dataset if dataset else None,
+            "report": report if report else None,
+            "earliest_year": earliest_year if earliest_year else None,
+            "latest_year": latest_year if latest_year else None,
+            "maxcount": maxcount
+        }
+        payload = convert_to_osti_search(parameters)
+        events = rag_results_to_events(search_osti(payload))
+    else:
+        events = stream_rag_retrieval(
+            q,
+            dataset=dataset,
+            report=report,
+            earliest_year=earliest_year,
+            latest_year=latest_year,
+            max_count=maxcount,
+            diversity=diversity,
+            recall=recall,
+            search_mode=search_mode,
+            diversity_mode=diversity_mode,
+            min_similarity=min_similarity,
+            score_cutoff=score_cutoff,
+            graph_expansion=graph_expansion,
+        )
+    # a search that fails after the first events were sent ends with an error event
+    return StreamingResponse(
+        (orjson.dumps(event) + b"\n" for event in end_rag_events_on_error(events)),
+        media_type="application/x-ndjson",
+    )
+
+
+class RagRetrievalSearch(BaseModel):
+    """Parameters of a single search in a batch RAG retrieval request."""
+
+    q: str = Field(..., description="Search query for semantic retrieval.")
+    dataset: str = Field(
+        "",
+        description="Optional dataset name to restrict search results to a specific dataset.",
+    )
+    report: str = Field(
+        "",
+        description="Optional report title to filter search results by a specific report.",
+    )
+    earliest_year: int | str | None = Field(
+        None,
+        description="Optional filter to limit results to content from this year or later.",
+    )
+    latest_year: int | str | None = Field(
+        None,
+        description="Optional filter to limit results to content from this year or earlier.",
+    )
+    diversity: float = Field(
+        0.0,
+        description="Diversity factor (0.0 - 1.0) for search results. Higher values promote more diverse results.",
+    )
+    maxcount: int = Field(
+        15, description="Maximum number of search results to return. Defaults to 15."
+    )
+    recall: float = Field(
+        0.5,
+        description="Vector search accuracy (0.0 - 1.0). Higher values are more accurate but slower.",
+    )
+    search_mode: Literal["semantic", "hybrid"] = Field(
+        "semantic",
+        description="How to retrieve excerpts. 'hybrid' combines vector search with full text search.",
+    )
+    diversity_mode: Literal["source", "mmr"] = Field(
+        "source",
+        description="How to add diversity. 'source' returns top matches from each data source. 'mmr' re-ranks a pool of top matches.",
+    )
+    min_similarity: float = Field(
+        0.0,
+        description="Minimum similarity score (0.0 - 1.0) of semantic search matches.",
+    )
+    score_cutoff: Literal["none", "knee"] = Field(
+        "none",
+        description="How to trim weak semantic search matches. 'knee' leaves out matches below the knee point of the similarity scores.",
+    )
+    graph_expansion: int = Field(
+        0,
+        description="Maximum number of excerpts to add through entities that co-occur with the semantic search matches.",
+    )
+    response_format: Literal["nested", "normalized"] = Field(
+        "nested",
+        description="Shape of the results. 'normalized' lists each source, report and excerpt once, keyed by ID. OSTI results are always returned as they are.",
+    )
+
+
+class RagRetrievalBatch(BaseModel):
+    """Body of a batch RAG retrieval request."""
+
+    searches: list[RagRetrievalSearch] = Field(
+        ...,
+        min_length=1,
+        max_length=RAG_BATCH_MAX_SEARCHES,
+        description="Searches to perform, with the same parameters as `/rag-retrieval`.",
+    )
+
+
+@app.post(
+    "/rag-retrieval/batch",
+    tags=["Search"],
+    responses={
+        200: {
+            "description": "string",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "results": [
+                            {
+                                "query": "string",
+                                "diversity": "string",
+                                "excerpts": [],
+                                "reports": [],
+                                "similarityScores": [],
+                                "indexThreshold": "number",
+                                "ragElapsedSeconds": "number",
+                                "stageElapsedSeconds": {},
+                                "failedStages": [],
+                            }
+                        ],
+                        "ragElapsedSeconds": "number",
+                    }
+                }
+            },
+        }
+    },
+)
+def batch_rag_retrieval_(batch: RagRetrievalBatch) -> ORJSONResponse:
+    """
+    Perform retrieval for RAG for several searches in one request.
+    The queries of all searches are embedded together in a single ML API call,
+    and the searches run concurrently. Results are returned in the same order
+    as the searches. A search that fails has an "error" key instead of results.
+    """
+    start_time = monotonic()
+    results = batch_rag_retrieval(
+        [
+            {
+                "query": search.q,
+                "dataset": search.dataset,
+                "report": search.report,
+                "earliest_year": search.earliest_year,
+                "latest_year": search.latest_year,
+                "max_count": search.maxcount,
+                "diversity": search.diversity,
+                "recall": search.recall,
+                "search_mode": search.search_mode,
+                "diversity_mode": search.diversity_mode,
+                "min_similarity": search.min_similarity,
+                "score_cutoff": search.score_cutoff,
+                "graph_expansion": search.graph_expansion,
+            }
+            for search in batch.searches
+        ]
+    )
+    results = [
+        (
+            normalize_rag_results(result)
+            if search.response_format == "normalized"
+            and search.dataset.lower() != "osti"
+            and "error" not in result
+            else result
+        )
+        for search, result in zip(batch.searches, results)
+    ]
+    return ORJSONResponse(
+        {
+            "results": results,
+            "ragElapsedSeconds": round(monotonic() - start_time, 2),
+        }
+    )
 
 
 if __name__ == "__main__":
@@ -1,13 +1,15 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
 import uvicorn
-from fastapi import FastAPI
+from time import monotonic
+from fastapi import FastAPI, Request, Response
 from pydantic import BaseModel, Field
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.docs import get_swagger_ui_html
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 from settings import ML_API_PORT
 from src.chat import determine_chat_action, DetermineChatActionPayload
@@ -15,6 +17,7 @@ from src.tokens import count_tokens
 
 from src.open_ai_llm import get_llm_stream, get_llm_response
 from src.bedrock_embeddings import create_embeddings
+from src.metrics import REQUEST_SECONDS, EMBEDDING_SECONDS, EMBEDDING_BATCH_SIZE
 
 app = FastAPI(
     title="COREII ML API",
@@ -34,6 +37,32 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Record the response time of each request, labeled by its route. The time is
+    observed once the response body is sent, so streamed responses are measured
+    until their last chunk instead of their first.
+    """
+    start = monotonic()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    labels = REQUEST_SECONDS.labels(
+        request.method, getattr(route, "path", "unmatched"), response.status_code
+    )
+    body_iterator = response.body_iterator
+
+    async def observe_when_sent():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            labels.observe(monotonic() - start)
+
+    response.body_iterator = observe_when_sent()
+    return response
+
+
 class LLMRequestPayload(BaseModel):
     messages: list[dict] = Field(
         ..., example=[{"role": "user", "content": [{"text": "Hello World!"}]}]
@@ -74,6 +103,12 @@ async def custom_swagger_ui_html():
     )
 
 
+@app.get("/metrics", tags=["Test"])
+async def metrics() -> Response:
+    """Get Prometheus metrics, including request latencies and embedding batch sizes."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/count-tokens", tags=["Tokens"])
 async def count_tokens_endpoint(input_string: str) -> int:
     """Count tokens in a string. Useful for testing offline functionality of tiktoken."""
@@ -103,7 +138,9 @@ async def create_embeddings_(
 ) -> list[list[float]]:
     """Create vector embeddings for a list of string inputs"""
     if request.inputs:
-        return create_embeddings(request.inputs)
+        EMBEDDING_BATCH_SIZE.observe(len(request.inputs))
+        with EMBEDDING_SECONDS.time():
+            return create_embeddings(request.inputs)
     return []
 
 
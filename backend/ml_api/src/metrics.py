@@ -0,0 +1,30 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+"""
+Prometheus metrics for the machine learning API.
+"""
+
+from prometheus_client import Histogram
+
+
+# Latency buckets in seconds, from cached tokenizer calls up to long LLM responses
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_SECONDS = Histogram(
+    "ml_api_request_seconds",
+    "Time to respond to API requests, by route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+EMBEDDING_SECONDS = Histogram(
+    "ml_api_embedding_seconds",
+    "Time to create a batch of vector embeddings.",
+    buckets=LATENCY_BUCKETS,
+)
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    "ml_api_embedding_batch_size",
+    "Number of inputs in each request to create vector embeddings.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)